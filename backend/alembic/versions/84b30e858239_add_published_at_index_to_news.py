@@ -0,0 +1,30 @@
+"""Add (published_at, id) index to news
+
+Revision ID: 84b30e858239
+Revises: e0a44546f3da
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '84b30e858239'
+down_revision: Union[str, None] = 'e0a44546f3da'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Индекс под keyset-пагинацию ленты: ORDER BY published_at DESC, id DESC
+    op.create_index(
+        "ix_news_published_at_id",
+        "news",
+        [sa.text("published_at DESC"), sa.text("id DESC")],
+    )
+
+def downgrade():
+    op.drop_index("ix_news_published_at_id", table_name="news")
@@ -0,0 +1,32 @@
+"""Make published_at NOT NULL in news and comments
+
+Revision ID: a6c3e9f2b7d5
+Revises: f3b8d1e6a9c4
+Create Date: 2026-10-18 19:20:41.118273
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c3e9f2b7d5'
+down_revision: Union[str, None] = 'f3b8d1e6a9c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # keyset-пагинация сравнивает (published_at, id) кортежем: NULL даёт
+    # NULL в сравнении и при DESC стоит первым, такие строки выпадают из ленты
+    for table in ("news", "comments"):
+        op.execute(f"UPDATE {table} SET published_at = now() WHERE published_at IS NULL")
+        op.alter_column(table, "published_at", existing_type=sa.DateTime(),
+                        nullable=False, server_default=sa.text("now()"))
+
+def downgrade():
+    for table in ("news", "comments"):
+        op.alter_column(table, "published_at", existing_type=sa.DateTime(),
+                        nullable=True, server_default=None)
@@ -0,0 +1,45 @@
+"""Add generated search_vector with GIN index to news
+
+Revision ID: b1f4c2d9a7e3
+Revises: 84b30e858239
+Create Date: 2026-10-18 14:05:12.604417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1f4c2d9a7e3'
+down_revision: Union[str, None] = '84b30e858239'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Колонка вычисляется самим Postgres при INSERT/UPDATE,
+    # выражение должно совпадать с models/news.py (SEARCH_CONFIG)
+    op.add_column(
+        "news",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR,
+            sa.Computed(
+                "setweight(to_tsvector('russian'::regconfig, coalesce(title, '')), 'A') || "
+                "setweight(jsonb_to_tsvector('russian'::regconfig, content, '[\"string\"]'), 'B')",
+                persisted=True,
+            ),
+        ),
+    )
+    op.create_index(
+        "ix_news_search_vector",
+        "news",
+        ["search_vector"],
+        postgresql_using="gin",
+    )
+
+def downgrade():
+    op.drop_index("ix_news_search_vector", table_name="news")
+    op.drop_column("news", "search_vector")
@@ -0,0 +1,31 @@
+"""Cascade refresh_tokens.user_id on user delete
+
+Revision ID: b9e4d7a1c3f8
+Revises: a6c3e9f2b7d5
+Create Date: 2026-10-18 21:04:17.306512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e4d7a1c3f8'
+down_revision: Union[str, None] = 'a6c3e9f2b7d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # сессии неактивных пользователей выгружаются в таблицу, и без каскада
+    # удаление такого пользователя падает на внешнем ключе
+    op.drop_constraint("refresh_tokens_user_id_fkey", "refresh_tokens", type_="foreignkey")
+    op.create_foreign_key(
+        "refresh_tokens_user_id_fkey", "refresh_tokens", "users", ["user_id"], ["id"], ondelete="CASCADE"
+    )
+
+def downgrade():
+    op.drop_constraint("refresh_tokens_user_id_fkey", "refresh_tokens", type_="foreignkey")
+    op.create_foreign_key("refresh_tokens_user_id_fkey", "refresh_tokens", "users", ["user_id"], ["id"])
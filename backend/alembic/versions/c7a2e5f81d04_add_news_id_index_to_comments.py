@@ -0,0 +1,32 @@
+"""Add (news_id, published_at, id) index to comments
+
+Revision ID: c7a2e5f81d04
+Revises: b1f4c2d9a7e3
+Create Date: 2026-10-18 15:02:37.118206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a2e5f81d04'
+down_revision: Union[str, None] = 'b1f4c2d9a7e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Postgres не индексирует внешние ключи сам: без индекса комментарии
+    # статьи и каскадное удаление новости читали всю таблицу.
+    # Порядок колонок совпадает с keyset-пагинацией комментариев
+    op.create_index(
+        "ix_comments_news_id_published_at_id",
+        "comments",
+        ["news_id", "published_at", "id"],
+    )
+
+def downgrade():
+    op.drop_index("ix_comments_news_id_published_at_id", table_name="comments")
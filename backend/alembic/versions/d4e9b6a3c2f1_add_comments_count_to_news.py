@@ -0,0 +1,34 @@
+"""Add comments_count counter to news
+
+Revision ID: d4e9b6a3c2f1
+Revises: c7a2e5f81d04
+Create Date: 2026-10-18 15:48:09.552371
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e9b6a3c2f1'
+down_revision: Union[str, None] = 'c7a2e5f81d04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column(
+        "news",
+        sa.Column("comments_count", sa.Integer, nullable=False, server_default="0"),
+    )
+    # начальное значение; дальше счётчик ведёт приложение
+    op.execute("""
+        UPDATE news SET comments_count = counts.cnt
+        FROM (SELECT news_id, count(*) AS cnt FROM comments GROUP BY news_id) counts
+        WHERE news.id = counts.news_id
+    """)
+
+def downgrade():
+    op.drop_column("news", "comments_count")
@@ -0,0 +1,29 @@
+"""Add user_id and expires_at indexes to refresh_tokens
+
+Revision ID: f3b8d1e6a9c4
+Revises: d4e9b6a3c2f1
+Create Date: 2026-10-18 19:41:05.527310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d1e6a9c4'
+down_revision: Union[str, None] = 'd4e9b6a3c2f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # refresh_tokens — холодный уровень хранилища сессий: сессии читаются
+    # и заменяются по пользователю, истёкшие удаляются по expires_at
+    op.create_index("ix_refresh_tokens_user_id", "refresh_tokens", ["user_id"])
+    op.create_index("ix_refresh_tokens_expires_at", "refresh_tokens", ["expires_at"])
+
+def downgrade():
+    op.drop_index("ix_refresh_tokens_expires_at", table_name="refresh_tokens")
+    op.drop_index("ix_refresh_tokens_user_id", table_name="refresh_tokens")
@@ -4,20 +4,25 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from models.user import User
 from repositories.user_repository import UserRepository
+from auth.claims import decode_access_token, revoked_before
 from database import get_db
 from cache import get_redis
 from sqlalchemy.ext.asyncio import AsyncSession
 from redis.asyncio import Redis
 import secrets
+import time
+from typing import Optional
 
 from config import settings
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # iat сверяется с эпохой отзыва в режиме AUTH_STATELESS
+    to_encode.update({"exp": expire, "iat": int(time.time())})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
     return encoded_jwt
 
@@ -30,20 +35,27 @@ def create_refresh_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, settings.REFRESH_SECRET_KEY, algorithm="HS256")
     return refresh_token, encoded_jwt
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db),
-    redis: Redis = Depends(get_redis)
-) -> User:
+# пользователь только из claims: для проверок прав сервисам хватает
+# id, роли и верификации, остальные поля не заполнены
+def _user_from_claims(claims: dict) -> User:
+    return User(
+        id=claims["user_id"],
+        login=claims.get("login"),
+        role=claims.get("role"),
+        is_author_verified=claims.get("is_author_verified"),
+    )
+
+async def _get_user_from_token(token: str, db: AsyncSession, redis: Redis) -> User:
     try:
-        payload = jwt.decode(
-            credentials.credentials,
-            settings.SECRET_KEY,
-            algorithms=["HS256"]
-        )
+        payload = decode_access_token(token)
         user_id: int = payload.get("user_id")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Could not validate credentials")
+        # токены без iat выданы до появления эпохи — для них обычный путь
+        if settings.AUTH_STATELESS and "iat" in payload:
+            if payload["iat"] < await revoked_before(redis, user_id):
+                raise HTTPException(status_code=401, detail="Token revoked")
+            return _user_from_claims(payload)
         user_repo = UserRepository(db, redis)
         # берём кэшированную версию, потому что 
         # это используется для проверки прав, 
@@ -55,6 +67,23 @@ async def get_current_user(
     except JWTError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis)
+) -> User:
+    return await _get_user_from_token(credentials.credentials, db, redis)
+
+# для ручек, где авторизация нужна не всегда (решает сам контроллер)
+async def get_current_user_optional(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis)
+) -> Optional[User]:
+    if credentials is None:
+        return None
+    return await _get_user_from_token(credentials.credentials, db, redis)
+
 async def get_current_admin(
     current_user: User = Depends(get_current_user)
 ):
@@ -0,0 +1,99 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from jose import jwt
+from redis.asyncio import Redis
+
+from cache import auth_epoch_cache, l1_cache
+from config import settings
+
+
+class ClaimsCache:
+    """
+    Ограниченный LRU проверенных access-токенов внутри воркера:
+    дайджест токена -> claims. Запись живёт до exp самого токена,
+    поэтому подпись и срок повторно не проверяются, а просроченный
+    токен снова идёт в jwt.decode и получает ошибку оттуда.
+    Кэшируются только успешно проверенные токены — мусорные не вытесняют живые.
+    """
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._data: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._digest(token)
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        claims, exp = item
+        if time.time() >= exp:
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return claims
+
+    def set(self, token: str, claims: dict) -> None:
+        exp = claims.get("exp")
+        if exp is None:
+            return
+        key = self._digest(token)
+        self._data[key] = (claims, exp)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def metrics(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "items": len(self._data),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+            "evictions": self.evictions,
+        }
+
+
+claims_cache = ClaimsCache(settings.JWT_CLAIMS_CACHE_SIZE)
+
+
+# claims не копируются: вызывающие их только читают
+def decode_access_token(token: str) -> dict:
+    claims = claims_cache.get(token)
+    if claims is None:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        claims_cache.set(token, claims)
+    return claims
+
+
+# Эпоха отзыва: access-токены пользователя, выданные раньше неё (по iat),
+# недействительны. Хранится в Redis не дольше жизни access-токена и
+# кэшируется в L1 вместе с отсутствием значения, так что на горячем пути
+# это чтение из памяти; изменение рассылается воркерам через pub/sub.
+async def revoked_before(redis: Redis, user_id: int) -> int:
+    key = await auth_epoch_cache.key(redis, user_id)
+    raw = l1_cache.get(key)
+    if raw is None:
+        raw = await redis.get(key) or b"0"
+        l1_cache.set(key, raw)
+    return int(raw)
+
+
+async def revoke_access_tokens(redis: Redis, user_id: int) -> None:
+    # iat — целые секунды: токены, выданные в ту же секунду, тоже отзываются
+    epoch = int(time.time()) + 1
+    await auth_epoch_cache.set_raw(redis, user_id, str(epoch).encode())
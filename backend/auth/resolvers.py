@@ -11,6 +11,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from redis.asyncio import Redis
 from auth.auth import get_current_user
 from models.user import User
+from typing import Optional
+
+
+# фильтр авторства для UPDATE/DELETE ... WHERE author_id = :owner_id:
+# админу можно всё, поэтому для него фильтра нет
+def owner_filter(current_user: User) -> Optional[int]:
+    return None if current_user.role == "admin" else current_user.id
 
 
 async def get_news_or_404(
@@ -35,9 +42,10 @@ async def get_news_or_404_with_permission(
 
 async def get_comment_or_404(
     comment_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis: Redis = Depends(get_redis)
 ) -> Comment:
-    repo = CommentRepository(db)
+    repo = CommentRepository(db, redis)
     comment = await repo.get(comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
@@ -0,0 +1,77 @@
+"""
+Сравнивает кодеки кэша (json / orjson / msgpack) со сжатием и без:
+время encode/decode и размер значения в Redis на статьях разного размера.
+Redis и БД не нужны:
+    python benchmarks/bench_cache_codec.py
+"""
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.codec import CacheCodec
+
+WORDS = (
+    "новости город правительство заявил сегодня проект развитие экономика "
+    "рынок компания данные исследование университет студенты технологии "
+    "the market report said growth data analysis policy increase percent "
+    "year since first million according official statement"
+).split()
+
+CODECS = ["json", "orjson", "msgpack"]
+COMPRESSIONS = ["none", "zlib", "zstd"]
+SIZES_KB = [2, 20, 200, 500]
+
+
+def make_article(size_kb: int, rng: random.Random) -> dict:
+    blocks = []
+    size = 0
+    while size < size_kb * 1024:
+        kind = rng.choice(["paragraph", "paragraph", "paragraph", "heading", "quote", "image"])
+        if kind == "image":
+            block = {"type": "image", "url": f"https://cdn.example.com/img/{rng.randrange(10**6)}.jpg", "caption": " ".join(rng.choices(WORDS, k=6))}
+        else:
+            block = {"type": kind, "text": " ".join(rng.choices(WORDS, k=rng.randint(8, 120)))}
+        blocks.append(block)
+        size += len(str(block))
+    return {
+        "id": rng.randrange(10**6),
+        "title": " ".join(rng.choices(WORDS, k=8)),
+        "content": {"blocks": blocks, "tags": rng.sample(WORDS, 5), "version": 3},
+        "published_at": datetime(2026, 10, 18, 12, 0).isoformat(),
+        "author_id": rng.randrange(1000),
+        "cover_url": "https://cdn.example.com/cover.jpg",
+    }
+
+
+def timeit(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'size':>6} {'codec':>8} {'compress':>8} {'bytes':>9} {'ratio':>6} {'encode us':>10} {'decode us':>10}")
+    for size_kb in SIZES_KB:
+        entry = {"d": make_article(size_kb, rng), "exp": time.time()}
+        repeat = max(20, 2000 // size_kb)
+        baseline = None
+        for codec_name in CODECS:
+            for compression in COMPRESSIONS:
+                codec = CacheCodec(codec_name, compression, min_compress_bytes=0)
+                data = codec.dumps(entry)
+                assert codec.loads(data) == entry
+                baseline = baseline or len(data)
+                encode_us = timeit(lambda: codec.dumps(entry), repeat)
+                decode_us = timeit(lambda: codec.loads(data), repeat)
+                print(f"{size_kb:>4}KB {codec_name:>8} {compression:>8} {len(data):>9} {len(data) / baseline:>6.2f} {encode_us:>10.1f} {decode_us:>10.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Считает запросы в БД, когда N конкурентных get_cached бьют в один холодный ключ.
+
+Запуск внутри контейнера backend (нужны живые Postgres и Redis):
+    python benchmarks/bench_cache_stampede.py --news-id 1 --requests 500 --processes 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import event
+
+from cache import init_redis, news_cache
+from database import engine, AsyncSessionLocal
+from repositories.news_repository import NewsRepository
+
+
+async def run_requests(news_id: int, requests: int) -> int:
+    queries = 0
+
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        nonlocal queries
+        queries += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_query)
+    redis_client = await init_redis()
+
+    async def one_request():
+        async with AsyncSessionLocal() as session:
+            return await NewsRepository(session, redis_client).get_cached(news_id)
+
+    results = await asyncio.gather(*[one_request() for _ in range(requests)])
+    assert all(news is not None for news in results), f"News {news_id} не найдена"
+    await engine.dispose()
+    return queries
+
+
+def worker(args) -> int:
+    news_id, requests = args
+    return asyncio.run(run_requests(news_id, requests))
+
+
+async def reset_key(news_id: int):
+    redis_client = await init_redis()
+    await news_cache.delete(redis_client, news_id)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--news-id", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args()
+
+    asyncio.run(reset_key(args.news_id))
+
+    per_process = args.requests // args.processes
+    start = time.perf_counter()
+    with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+        queries = pool.map(worker, [(args.news_id, per_process)] * args.processes)
+    elapsed = time.perf_counter() - start
+
+    print(f"requests:  {per_process * args.processes} ({args.processes} процессов)")
+    print(f"db queries: {sum(queries)} (по процессам: {queries})")
+    print(f"elapsed:   {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
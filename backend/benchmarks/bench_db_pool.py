@@ -0,0 +1,102 @@
+"""
+Нагрузочный тест пула: где начинается исчерпание для каждой конфигурации.
+
+Каждый «запрос» берёт соединение и держит его --hold-ms (SELECT pg_sleep),
+как типичный запрос API. Для каждой пары (pool_size, max_overflow) и уровня
+конкурентности печатается ожидание checkout (p50/p99 из гистограммы пула),
+число таймаутов и пропускная способность. Исчерпание видно по скачку
+p99 ожидания, когда конкурентность превышает pool_size + max_overflow.
+
+Запуск внутри контейнера backend (нужен живой Postgres):
+    python benchmarks/bench_db_pool.py --configs 5:0 10:10 20:20 --concurrency 5 10 20 40 80
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import settings
+from utils.db_pool import WAIT_BUCKETS_MS, CheckoutStats, TimedAsyncAdaptedQueuePool
+
+
+def percentile_ms(stats: CheckoutStats, q: float) -> str:
+    # оценка сверху по границе корзины гистограммы
+    target = stats.checkouts * q
+    seen = 0
+    for le, count in zip(list(WAIT_BUCKETS_MS) + [float("inf")], stats.buckets):
+        seen += count
+        if count and seen >= target:
+            return f"<={le}" if le != float("inf") else f">{WAIT_BUCKETS_MS[-1]}"
+    return "-"
+
+
+async def run_level(pool_size: int, max_overflow: int, concurrency: int, requests: int, hold_ms: int, timeout: float):
+    # свежая статистика на каждый прогон
+    TimedAsyncAdaptedQueuePool.stats = CheckoutStats()
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        poolclass=TimedAsyncAdaptedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=timeout,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async def client():
+        while not queue.empty():
+            queue.get_nowait()
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT pg_sleep(:s)"), {"s": hold_ms / 1000})
+            except exc.TimeoutError:
+                pass
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+
+    stats = TimedAsyncAdaptedQueuePool.stats
+    print(
+        f"{pool_size:>5} {max_overflow:>8} {concurrency:>6} "
+        f"{percentile_ms(stats, 0.5):>9} {percentile_ms(stats, 0.99):>9} "
+        f"{stats.max_wait * 1000:>9.1f} {stats.timeouts:>8} {requests / elapsed:>8.1f}"
+    )
+
+
+async def run(configs, levels, requests: int, hold_ms: int, timeout: float):
+    print(f"{'pool':>5} {'overflow':>8} {'conc':>6} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'timeouts':>8} {'rps':>8}")
+    for pool_size, max_overflow in configs:
+        for concurrency in levels:
+            await run_level(pool_size, max_overflow, concurrency, requests, hold_ms, timeout)
+        print()
+
+
+def parse_config(value: str):
+    pool_size, max_overflow = value.split(":")
+    return int(pool_size), int(max_overflow)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--configs", type=parse_config, nargs="+", default=[(5, 0), (10, 10), (20, 20)],
+                        help="pool_size:max_overflow")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[5, 10, 20, 40, 80])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--hold-ms", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=settings.DB_POOL_TIMEOUT)
+    args = parser.parse_args()
+    asyncio.run(run(args.configs, args.concurrency, args.requests, args.hold_ms, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Латентность полнотекстового поиска (/news/search) на большой таблице.
+
+Таблица news дозаполняется синтетическими статьями до --rows (по умолчанию 1M):
+заголовок и несколько абзацев в content из случайных слов словаря, поэтому
+одни слова встречаются часто, а редкие — в единицах статей. Затем для каждого
+запроса снимается медиана времени и план (должен идти через ix_news_search_vector).
+Синтетические строки помечены cover_url и удаляются в конце, если не указан --keep.
+
+Запуск внутри контейнера backend (нужен живой Postgres с хотя бы одним пользователем):
+    python benchmarks/bench_news_search.py --rows 1000000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from database import engine
+from models.news import SEARCH_CONFIG
+
+MARKER = "bench:search"
+BATCH = 100_000
+
+COMMON_WORDS = [
+    "новости", "город", "правительство", "проект", "развитие", "экономика", "рынок",
+    "компания", "данные", "исследование", "университет", "студенты", "технологии",
+]
+RARE_WORDS = ["квантовый", "археология", "вулкан", "шахматы", "телескоп"]
+
+QUERIES = [
+    "новости",
+    "экономика рынок",
+    "\"развитие технологии\"",
+    "университет -студенты",
+    "телескоп",
+    "вулкан археология",
+    "несуществующееслово",
+]
+
+SEED_SQL = """
+    INSERT INTO news (title, content, published_at, author_id, cover_url)
+    SELECT
+        (SELECT string_agg(w, ' ') FROM (
+            SELECT ((:common)::text[])[1 + floor(random() * cardinality((:common)::text[]))::int] AS w
+            FROM generate_series(1, 6 + g % 2)
+        ) t),
+        jsonb_build_object('blocks', (
+            SELECT jsonb_agg(jsonb_build_object('type', 'paragraph', 'text', p))
+            FROM (
+                SELECT string_agg(
+                    CASE WHEN random() < 0.0005
+                         THEN ((:rare)::text[])[1 + floor(random() * cardinality((:rare)::text[]))::int]
+                         ELSE ((:common)::text[])[1 + floor(random() * cardinality((:common)::text[]))::int]
+                    END, ' ') AS p
+                FROM generate_series(1, 3 + g % 2) b, generate_series(1, 40 + g % 7) w
+                GROUP BY b
+            ) paragraphs
+        )),
+        now() - random() * interval '365 days',
+        :author_id,
+        :marker
+    FROM generate_series(1, :rows) g
+"""
+
+
+async def seed(rows: int, author_id: int):
+    async with engine.begin() as conn:
+        existing = (await conn.execute(text("SELECT count(*) FROM news"))).scalar()
+    todo = max(0, rows - existing)
+    print(f"в таблице {existing} строк, добавляем {todo}")
+
+    start = time.perf_counter()
+    while todo > 0:
+        batch = min(BATCH, todo)
+        async with engine.begin() as conn:
+            await conn.execute(text(SEED_SQL), {
+                "common": COMMON_WORDS, "rare": RARE_WORDS,
+                "author_id": author_id, "marker": MARKER, "rows": batch,
+            })
+        todo -= batch
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE news"))
+    print(f"заполнение: {time.perf_counter() - start:.1f}s")
+
+
+async def measure(q: str, limit: int, repeat: int) -> dict:
+    sql = f"""
+        SELECT id, title, published_at, author_id, cover_url
+        FROM news
+        WHERE search_vector @@ websearch_to_tsquery('{SEARCH_CONFIG}'::regconfig, :q)
+        ORDER BY ts_rank_cd(search_vector, websearch_to_tsquery('{SEARCH_CONFIG}'::regconfig, :q)) DESC, id DESC
+        LIMIT :limit
+    """
+    params = {"q": q, "limit": limit}
+    async with engine.connect() as conn:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await conn.execute(text(sql), params)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        plan = (await conn.execute(text("EXPLAIN (ANALYZE, FORMAT JSON) " + sql), params)).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        count = (await conn.execute(text(
+            f"SELECT count(*) FROM news WHERE search_vector @@ websearch_to_tsquery('{SEARCH_CONFIG}'::regconfig, :q)"
+        ), params)).scalar()
+
+    timings.sort()
+    return {
+        "matches": count,
+        "median_ms": statistics.median(timings),
+        "p95_ms": timings[int(len(timings) * 0.95) - 1],
+        "uses_index": "ix_news_search_vector" in json.dumps(plan),
+    }
+
+
+async def run(rows: int, limit: int, repeat: int, keep: bool):
+    async with engine.begin() as conn:
+        author_id = (await conn.execute(text("SELECT id FROM users ORDER BY id LIMIT 1"))).scalar()
+    assert author_id is not None, "Нужен хотя бы один пользователь"
+
+    try:
+        await seed(rows, author_id)
+        print(f"{'query':>28} {'matches':>9} {'median ms':>10} {'p95 ms':>8} {'index':>6}")
+        for q in QUERIES:
+            stats = await measure(q, limit, repeat)
+            print(f"{q:>28} {stats['matches']:>9} {stats['median_ms']:>10.2f} {stats['p95_ms']:>8.2f} {str(stats['uses_index']):>6}")
+    finally:
+        if not keep:
+            async with engine.begin() as conn:
+                await conn.execute(text("DELETE FROM news WHERE cover_url = :marker"), {"marker": MARKER})
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="не удалять синтетические строки")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.limit, args.repeat, args.keep))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Показывает, что стоимость запроса /news/recent не растёт вместе с таблицей:
+по индексу ix_news_published_at_id читается только окно за N дней с LIMIT.
+
+Таблица news дозаполняется синтетическими строками (published_at равномерно
+за последний год), после каждого шага снимается EXPLAIN (ANALYZE, BUFFERS).
+Синтетические строки помечены заголовком и удаляются в конце.
+
+Запуск внутри контейнера backend (нужен живой Postgres с хотя бы одним пользователем):
+    python benchmarks/bench_recent_news.py --sizes 10000 100000 1000000 --days 1 --limit 20
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from database import engine
+
+MARKER = "bench:recent"
+
+RECENT_QUERY = """
+    SELECT id, title, published_at, author_id, cover_url
+    FROM news
+    WHERE published_at >= :cutoff
+    ORDER BY published_at DESC, id DESC
+    LIMIT :limit
+"""
+
+
+async def seed(conn, rows: int, author_id: int):
+    await conn.execute(text("""
+        INSERT INTO news (title, content, published_at, author_id)
+        SELECT :marker, '{}'::jsonb, now() - random() * interval '365 days', :author_id
+        FROM generate_series(1, :rows)
+    """), {"marker": MARKER, "rows": rows, "author_id": author_id})
+    await conn.execute(text("ANALYZE news"))
+
+
+async def measure(conn, days: int, limit: int, repeat: int) -> dict:
+    params = {"cutoff": datetime.utcnow() - timedelta(days=days), "limit": limit}
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await conn.execute(text(RECENT_QUERY), params)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    result = await conn.execute(text("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + RECENT_QUERY), params)
+    plan = result.scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    root = plan[0]["Plan"]
+
+    return {
+        "median_ms": statistics.median(timings),
+        "buffers": root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0),
+        "uses_index": "ix_news_published_at_id" in json.dumps(plan),
+    }
+
+
+async def run(sizes, days: int, limit: int, repeat: int):
+    async with engine.begin() as conn:
+        author_id = (await conn.execute(text("SELECT id FROM users ORDER BY id LIMIT 1"))).scalar()
+    assert author_id is not None, "Нужен хотя бы один пользователь"
+
+    print(f"{'rows':>10} {'median ms':>10} {'buffers':>8} {'index':>6}")
+    total = 0
+    try:
+        for size in sizes:
+            async with engine.begin() as conn:
+                await seed(conn, size - total, author_id)
+                total = size
+                stats = await measure(conn, days, limit, repeat)
+            print(f"{size:>10} {stats['median_ms']:>10.2f} {stats['buffers']:>8} {str(stats['uses_index']):>6}")
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text("DELETE FROM news WHERE title = :marker"), {"marker": MARKER})
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(sorted(args.sizes), args.days, args.limit, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Пропускная способность ротации refresh-токена: прежняя последовательность
+команд (GET + EXISTS, затем DELETE/SREM/SETEX и SETEX/SADD — пять и более
+round trip) против одного Lua-скрипта RefreshTokenRepository.rotate.
+
+Каждый клиент держит свою цепочку токенов и ротирует её --rotations раз,
+как браузер, обновляющий access-токен. Печатается число ротаций в секунду
+и медиана/p99 латентности одной ротации. Ключи бенчмарка удаляются в конце.
+
+Запуск внутри контейнера backend (нужен живой Redis):
+    python benchmarks/bench_refresh_rotation.py --concurrency 1 10 50 --rotations 500
+"""
+import argparse
+import asyncio
+import secrets
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from cache import close_redis, init_redis
+from config import settings
+from database import AsyncSessionLocal
+from repositories.refresh_token_repository import RefreshTokenRepository
+from utils.codec import cache_codec
+
+# id пользователей бенчмарка, чтобы не задеть сессии живых пользователей
+BASE_USER_ID = 900_000_000
+TTL = settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+META = {"user_agent": "bench", "created_at": "2026-01-01T00:00:00"}
+
+
+async def rotate_legacy(repo: RefreshTokenRepository, user_id: int, token: str) -> str:
+    # прежняя раскладка и прежний порядок команд, по одной на round trip
+    redis_client = repo.redis
+    data = await redis_client.get(f"user_id:refresh:{token}")
+    if not data or await redis_client.exists(f"token:blacklist:{user_id}:{token}"):
+        raise RuntimeError("токен не найден")
+    await redis_client.delete(f"user_id:refresh:{token}")
+    await redis_client.srem(f"user_id:sessions:{user_id}", token)
+    await redis_client.setex(f"token:blacklist:{user_id}:{token}", TTL, "revoked")
+    new_token = secrets.token_urlsafe(32)
+    await redis_client.setex(f"user_id:refresh:{new_token}", TTL, cache_codec.dumps({"user_id": user_id, "token": new_token, **META}))
+    await redis_client.sadd(f"user_id:sessions:{user_id}", new_token)
+    return new_token
+
+
+async def rotate_script(repo: RefreshTokenRepository, user_id: int, token: str) -> str:
+    new_token = secrets.token_urlsafe(32)
+    if not await repo.rotate(user_id=user_id, token=token, new_token=new_token, meta=META):
+        raise RuntimeError("токен не найден")
+    return new_token
+
+
+async def run_level(redis_client, name: str, rotate, concurrency: int, rotations: int):
+    # пользователи бенчмарка всегда горячие, в Postgres репозиторий не ходит
+    session = AsyncSessionLocal()
+    repo = RefreshTokenRepository(session, redis_client)
+    timings = []
+
+    async def client(user_id: int):
+        token = secrets.token_urlsafe(32)
+        # в прежней раскладке токен подхватывается и legacy-, и Lua-ротацией
+        await redis_client.setex(f"user_id:refresh:{token}", TTL, cache_codec.dumps({"user_id": user_id, "token": token, **META}))
+        for _ in range(rotations):
+            start = time.perf_counter()
+            token = await rotate(repo, user_id, token)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client(BASE_USER_ID + i) for i in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    await session.close()
+    timings.sort()
+    print(
+        f"{name:>8} {concurrency:>6} {len(timings) / elapsed:>10.0f} "
+        f"{statistics.median(timings):>9.2f} {timings[int(len(timings) * 0.99) - 1]:>9.2f}"
+    )
+
+
+async def cleanup(redis_client, concurrency: int):
+    for user_id in range(BASE_USER_ID, BASE_USER_ID + concurrency):
+        tokens = await redis_client.smembers(f"user_id:sessions:{user_id}")
+        keys = [f"user_id:refresh:{t.decode()}" for t in tokens]
+        await redis_client.delete(f"sessions:{user_id}", f"sessions:exp:{user_id}", f"user_id:sessions:{user_id}", *keys)
+        await redis_client.zrem("sessions:active", user_id)
+        async for key in redis_client.scan_iter(match=f"token:blacklist:{user_id}:*", count=1000):
+            await redis_client.delete(key)
+
+
+async def run(levels, rotations: int):
+    redis_client = await init_redis()
+    print(f"{'mode':>8} {'conc':>6} {'rot/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    try:
+        for concurrency in levels:
+            await run_level(redis_client, "legacy", rotate_legacy, concurrency, rotations)
+            await run_level(redis_client, "lua", rotate_script, concurrency, rotations)
+    finally:
+        await cleanup(redis_client, max(levels))
+        await close_redis()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--rotations", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.rotations))
+
+
+if __name__ == "__main__":
+    main()
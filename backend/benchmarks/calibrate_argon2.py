@@ -0,0 +1,102 @@
+"""
+Подбор параметров Argon2id под железо: целевая латентность одного хеша
+и бюджет памяти на воркер пула.
+
+Память важнее числа проходов (RFC 9106): берём максимальную память из
+бюджета и наибольший time_cost, укладывающийся в --target-ms. Если не
+укладывается даже time_cost=1, память уменьшается вдвое, но не ниже
+--min-memory-mib. Хеши считаются в --concurrency процессах одновременно,
+как в пуле PasswordHasherPool, — так латентность учитывает конкуренцию
+за кэш и шину памяти.
+
+Печатает предложенные ARGON2_* для .env и ожидаемую пропускную способность
+входа. Старые хеши пересчитываются при следующем входе пользователя
+(AuthService.login, check_needs_rehash), сброс паролей не нужен.
+
+Запуск внутри контейнера backend (на том железе, где он работает):
+    python benchmarks/calibrate_argon2.py --target-ms 250 --memory-mib 64
+"""
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from argon2 import PasswordHasher
+
+from config import settings
+
+PASSWORD = "Calibrat10n_p@ssw0rd"
+
+
+def hash_once(time_cost: int, memory_kib: int, parallelism: int) -> float:
+    ph = PasswordHasher(time_cost=time_cost, memory_cost=memory_kib, parallelism=parallelism, hash_len=32, salt_len=16)
+    start = time.perf_counter()
+    ph.hash(PASSWORD)
+    return (time.perf_counter() - start) * 1000
+
+
+def measure(pool: ProcessPoolExecutor, concurrency: int, rounds: int, time_cost: int, memory_kib: int, parallelism: int) -> float:
+    # медиана по rounds волнам из concurrency одновременных хешей
+    timings = []
+    for _ in range(rounds):
+        futures = [pool.submit(hash_once, time_cost, memory_kib, parallelism) for _ in range(concurrency)]
+        timings += [f.result() for f in futures]
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, memory_kib: int, min_memory_kib: int, parallelism: int,
+              concurrency: int, rounds: int, max_time_cost: int):
+    print(f"{'memory MiB':>10} {'t':>3} {'median ms':>10}")
+    with ProcessPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            best = None
+            for time_cost in range(1, max_time_cost + 1):
+                ms = measure(pool, concurrency, rounds, time_cost, memory_kib, parallelism)
+                print(f"{memory_kib // 1024:>10} {time_cost:>3} {ms:>10.1f}")
+                if ms > target_ms:
+                    break
+                best = (time_cost, ms)
+            if best is not None:
+                return memory_kib, best[0], best[1]
+            if memory_kib // 2 < min_memory_kib:
+                # даже минимальные параметры медленнее цели — предлагаем их
+                return memory_kib, 1, ms
+            memory_kib //= 2
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target-ms", type=float, default=250, help="целевая медиана одного хеша")
+    parser.add_argument("--memory-mib", type=int, default=settings.ARGON2_MEMORY_COST // 1024,
+                        help="бюджет памяти на один хеш (и процесс пула)")
+    parser.add_argument("--min-memory-mib", type=int, default=19, help="нижняя граница (рекомендация OWASP)")
+    parser.add_argument("--parallelism", type=int, default=settings.ARGON2_PARALLELISM)
+    parser.add_argument("--concurrency", type=int, default=settings.PASSWORD_HASH_WORKERS,
+                        help="одновременных хешей, по умолчанию как процессов в пуле")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--max-time-cost", type=int, default=10)
+    args = parser.parse_args()
+
+    memory_kib, time_cost, ms = calibrate(
+        args.target_ms, args.memory_mib * 1024, args.min_memory_mib * 1024, args.parallelism,
+        args.concurrency, args.rounds, args.max_time_cost,
+    )
+
+    print("\nТекущие параметры:")
+    print(f"  ARGON2_TIME_COST={settings.ARGON2_TIME_COST} ARGON2_MEMORY_COST={settings.ARGON2_MEMORY_COST} "
+          f"ARGON2_PARALLELISM={settings.ARGON2_PARALLELISM}")
+    print("Предлагаемые параметры (.env):")
+    print(f"  ARGON2_TIME_COST={time_cost}")
+    print(f"  ARGON2_MEMORY_COST={memory_kib}")
+    print(f"  ARGON2_PARALLELISM={args.parallelism}")
+    print(f"Медиана хеша: {ms:.1f} ms при {args.concurrency} одновременных; "
+          f"пул из {settings.PASSWORD_HASH_WORKERS} процессов — ~{settings.PASSWORD_HASH_WORKERS * 1000 / ms:.1f} входов/с "
+          f"и {settings.PASSWORD_HASH_WORKERS * memory_kib // 1024} MiB памяти под Argon2")
+
+
+if __name__ == "__main__":
+    main()
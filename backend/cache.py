@@ -1,23 +1,434 @@
+import asyncio
+import json
+import logging
+import secrets
+import time
 import redis.asyncio as redis
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
 from config import settings
-from typing import Optional, AsyncGenerator
+from utils.cache_entry import encode_entry, decode_entry, redis_ttl
+from utils.lru import LRUCache
+from utils.retry import retry_async
+from typing import Optional, AsyncGenerator, Any, Awaitable, Callable, Dict, List
+
+logger = logging.getLogger("uvicorn")
+
+# L1: кэш внутри воркера перед Redis, общий для всех namespace.
+# Изменения сущностей рассылаются через pub/sub, короткий TTL страхует
+# от потерянных сообщений.
+l1_cache = LRUCache(
+    max_items=settings.L1_CACHE_MAX_ITEMS,
+    max_bytes=settings.L1_CACHE_MAX_BYTES,
+    ttl=settings.L1_CACHE_TTL,
+)
+# свои же сообщения об инвалидации воркер пропускает
+WORKER_ID = secrets.token_hex(8)
 
 redis_client: Optional[redis.Redis] = None
+# конкурентные первые вызовы init_redis не должны создать несколько клиентов
+_init_lock = asyncio.Lock()
 
+def _create_client() -> redis.Redis:
+    # Blocking-пул: при исчерпании ждём соединение REDIS_POOL_TIMEOUT, а не падаем сразу.
+    # Повтор команды — один и быстрый, чтобы сбой Redis не растягивал ответ
+    pool = redis.BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        retry=Retry(ExponentialBackoff(cap=0.2, base=0.02), 1),
+    )
+    # значения в байтах: их кодирует utils.codec (в т.ч. сжатые)
+    return redis.Redis(connection_pool=pool)
+
+# вызывается из lifespan до приёма запросов
 async def init_redis() -> redis.Redis:
     global redis_client
-    if redis_client is None:
-        redis_client = redis.Redis.from_url(
-            settings.REDIS_URL,
-            encoding="utf-8",
-            decode_responses=True
-        )
-        # Тестовое подключение
-        await redis_client.ping()
+    async with _init_lock:
+        if redis_client is None:
+            client = _create_client()
+            try:
+                await retry_async(client.ping, "Redis")
+            except Exception:
+                await client.aclose(close_connection_pool=True)
+                raise
+            # прогрев: первые запросы не платят за открытие соединений
+            warmup = min(settings.REDIS_WARMUP_CONNECTIONS, settings.REDIS_MAX_CONNECTIONS)
+            await asyncio.gather(*[client.ping() for _ in range(warmup)])
+            redis_client = client
+            logger.info(f"[REDIS] Подключено, открыто соединений: {warmup}")
     return redis_client
 
-async def get_redis() -> redis.Redis:
+async def close_redis() -> None:
     global redis_client
+    async with _init_lock:
+        if redis_client is not None:
+            await redis_client.aclose(close_connection_pool=True)
+            redis_client = None
+
+async def get_redis() -> redis.Redis:
+    # клиент создаёт lifespan; ленивая инициализация — для скриптов и бенчмарков
     if redis_client is None:
         await init_redis()
     yield redis_client
+
+
+# снимаем лок, только если он всё ещё наш (мог истечь и достаться другому)
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# замена значения, только если оно не изменилось с момента чтения
+_REPLACE_IF_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    redis.call("set", KEYS[1], ARGV[2], "EX", ARGV[3])
+    return 1
+end
+return 0
+"""
+
+# запись производного значения, только если с момента чтения исходных
+# данных поколение записи не менялось (KEYS[2], "" — ключа нет)
+# и значение ещё не записано
+_SET_IF_GENERATION_SCRIPT = """
+if (redis.call("get", KEYS[2]) or "") ~= ARGV[1] then
+    return 0
+end
+if redis.call("set", KEYS[1], ARGV[2], "EX", ARGV[3], "NX") then
+    return 1
+end
+return 0
+"""
+
+
+_namespaces: Dict[str, "CacheNamespace"] = {}
+
+
+async def _publish(redis_client: redis.Redis, message: dict) -> None:
+    message["origin"] = WORKER_ID
+    await redis_client.publish(settings.CACHE_INVALIDATION_CHANNEL, json.dumps(message))
+
+
+class CacheNamespace:
+    """
+    Пространство ключей кэша одной сущности: news:v{version}:{id}.
+    Версия входит в ключ, поэтому INCR версии разом делает недоступными
+    все старые записи (они дотухнут по TTL). Сама версия кэшируется в
+    процессе на CACHE_VERSION_REFRESH_SECONDS, чтобы не платить лишний
+    round trip на каждое чтение.
+
+    Перед Redis стоит L1 (l1_cache) — повторные чтения горячих ключей
+    обходятся без сети; записи рассылают инвалидацию остальным воркерам.
+
+    get_or_load защищает БД от thundering herd на промахе:
+    внутри процесса все ожидающие делят один future на ключ,
+    между процессами — короткий Redis-лок; пока один воркер обновляет
+    устаревшую запись, остальные отдают старое значение.
+    """
+
+    def __init__(self, name: str, ttl: int, generations: bool = False):
+        self.name = name
+        self.ttl = ttl
+        # поколения записей (см. generation): для значений, собранных из
+        # других кэшей, которые могут устареть между чтением и записью
+        self.generations = generations
+        self._version: Optional[str] = None
+        self._version_checked_at = 0.0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        _namespaces[name] = self
+
+    @property
+    def version_key(self) -> str:
+        return f"{self.name}:version"
+
+    async def version(self, redis_client: redis.Redis) -> str:
+        now = time.monotonic()
+        if self._version is None or now - self._version_checked_at > settings.CACHE_VERSION_REFRESH_SECONDS:
+            version = await redis_client.get(self.version_key)
+            self._version = version.decode() if version else "0"
+            self._version_checked_at = now
+        return self._version
+
+    async def key(self, redis_client: redis.Redis, suffix) -> str:
+        return f"{self.name}:v{await self.version(redis_client)}:{suffix}"
+
+    async def invalidate_all(self, redis_client: redis.Redis) -> None:
+        self._version = str(await redis_client.incr(self.version_key))
+        self._version_checked_at = time.monotonic()
+        await _publish(redis_client, {"ns": self.name, "version": self._version})
+
+    def _set_version(self, version: str) -> None:
+        self._version = version
+        self._version_checked_at = time.monotonic()
+
+    async def set(self, redis_client: redis.Redis, suffix, payload, nx: bool = False) -> None:
+        key = await self.key(redis_client, suffix)
+        entry = encode_entry(payload, self.ttl)
+        await redis_client.set(key, entry, ex=redis_ttl(self.ttl), nx=nx)
+        if nx:
+            # не знаем, чья запись осталась в Redis — в L1 не кладём
+            l1_cache.delete(key)
+        else:
+            l1_cache.set(key, entry)
+            await _publish(redis_client, {"ns": self.name, "key": key})
+
+    async def set_many(self, redis_client: redis.Redis, payloads: Dict[Any, Any], nx: bool = False) -> None:
+        if not payloads:
+            return
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for suffix, payload in payloads.items():
+                pipe.set(await self.key(redis_client, suffix), encode_entry(payload, self.ttl), ex=redis_ttl(self.ttl), nx=nx)
+            await pipe.execute()
+
+    # сырые значения (готовое тело ответа): без кодека и мягкого TTL,
+    # хит — это ровно те байты, что уйдут клиенту
+    async def get_raw(self, redis_client: redis.Redis, suffix) -> Optional[bytes]:
+        key = await self.key(redis_client, suffix)
+        raw = l1_cache.get(key)
+        if raw is not None:
+            return raw
+        raw = await redis_client.get(key)
+        if raw is not None:
+            l1_cache.set(key, raw)
+        return raw
+
+    async def set_raw(self, redis_client: redis.Redis, suffix, raw: bytes, nx: bool = False) -> None:
+        key = await self.key(redis_client, suffix)
+        if not nx:
+            await self._bump_generation(redis_client, suffix)
+        stored = await redis_client.set(key, raw, ex=self.ttl, nx=nx)
+        if stored:
+            l1_cache.set(key, raw)
+        if not nx:
+            await _publish(redis_client, {"ns": self.name, "key": key})
+
+    # Поколение записи меняется при каждой перезаписи и удалении. Читатель
+    # берёт его до чтения исходных данных и передаёт в set_raw_if_generation:
+    # если запись успели обновить или удалить, его устаревшее значение не ляжет
+    async def generation(self, redis_client: redis.Redis, suffix) -> bytes:
+        return await redis_client.get(self._generation_key(suffix)) or b""
+
+    async def set_raw_if_generation(self, redis_client: redis.Redis, suffix, raw: bytes, generation: bytes) -> None:
+        key = await self.key(redis_client, suffix)
+        stored = await redis_client.eval(
+            _SET_IF_GENERATION_SCRIPT, 2, key, self._generation_key(suffix), generation, raw, self.ttl
+        )
+        if stored:
+            l1_cache.set(key, raw)
+
+    def _generation_key(self, suffix) -> str:
+        return f"{self.name}:gen:{suffix}"
+
+    async def _bump_generation(self, redis_client: redis.Redis, suffix) -> None:
+        if not self.generations:
+            return
+        # TTL как у записи: истёкшее поколение читается как "", и запись
+        # читателя, взявшего его раньше, просто не состоится
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.incr(self._generation_key(suffix))
+            pipe.expire(self._generation_key(suffix), self.ttl)
+            await pipe.execute()
+
+    async def delete(self, redis_client: redis.Redis, suffix) -> None:
+        key = await self.key(redis_client, suffix)
+        await self._bump_generation(redis_client, suffix)
+        await redis_client.delete(key)
+        l1_cache.delete(key)
+        await _publish(redis_client, {"ns": self.name, "key": key})
+
+    # свежие записи по списку суффиксов: сначала L1, остальное одним MGET;
+    # устаревшие считаются промахом
+    async def get_many(self, redis_client: redis.Redis, suffixes: List[Any]) -> Dict[Any, Any]:
+        found = {}
+        remote = {}
+        for suffix in suffixes:
+            key = await self.key(redis_client, suffix)
+            payload = self._get_local(key)
+            if payload is not None:
+                found[suffix] = payload
+            else:
+                remote[suffix] = key
+        if not remote:
+            return found
+
+        for (suffix, key), raw in zip(remote.items(), await redis_client.mget(list(remote.values()))):
+            if raw:
+                payload, stale = decode_entry(raw)
+                if not stale:
+                    l1_cache.set(key, raw)
+                    found[suffix] = payload
+        return found
+
+    def _get_local(self, key: str):
+        raw = l1_cache.get(key)
+        if raw is None:
+            return None
+        payload, stale = decode_entry(raw)
+        if stale:
+            l1_cache.delete(key)
+            return None
+        return payload
+
+    async def get_or_load(self, redis_client: redis.Redis, suffix, loader: Callable[[], Awaitable[Any]]):
+        key = await self.key(redis_client, suffix)
+
+        payload = self._get_local(key)
+        if payload is not None:
+            logger.debug(f"[L1 HIT] {key} получен из памяти воркера")
+            return payload
+
+        raw = await redis_client.get(key)
+        if raw:
+            payload, stale = decode_entry(raw)
+            if not stale:
+                logger.info(f"[CACHE HIT] {key} получен из Redis")
+                l1_cache.set(key, raw)
+                return payload
+            # устарело: обновляет тот, кто взял лок, остальные отдают старое
+            return await self._single_flight(key, lambda: self._revalidate(redis_client, key, loader, payload, raw))
+
+        return await self._single_flight(key, lambda: self._fill(redis_client, key, loader))
+
+    async def _single_flight(self, key: str, fn: Callable[[], Awaitable[Any]]):
+        future = self._inflight.get(key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # отменили лидера (клиент ушёл) — пробуем сами, если не отменили нас
+                if not future.cancelled():
+                    raise
+                return await self._single_flight(key, fn)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # помечаем исключение полученным, если ожидающих не было
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    # лок берётся внутри single-flight: присоединившиеся к лидеру корутины
+    # не держат собственный токен, который некому было бы отпустить
+    async def _revalidate(self, redis_client: redis.Redis, key: str, loader, stale_payload, stale_raw: bytes):
+        lock_token = await self._acquire_lock(redis_client, key)
+        if lock_token is None:
+            logger.info(f"[CACHE STALE] {key} отдан устаревшим, обновляет другой воркер")
+            return stale_payload
+        return await self._refresh(redis_client, key, loader, lock_token, expected=stale_raw)
+
+    async def _fill(self, redis_client: redis.Redis, key: str, loader):
+        lock_token = await self._acquire_lock(redis_client, key)
+        if lock_token is not None:
+            return await self._refresh(redis_client, key, loader, lock_token, nx=True)
+
+        # ключ грузит другой процесс — ждём его результата не дольше лока
+        deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT_MS / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.CACHE_LOCK_POLL_MS / 1000)
+            async with redis_client.pipeline(transaction=False) as pipe:
+                raw, locked = await pipe.get(key).exists(f"lock:{key}").execute()
+            if raw:
+                logger.info(f"[CACHE HIT] {key} дождались загрузки другим воркером")
+                l1_cache.set(key, raw)
+                return decode_entry(raw)[0]
+            if not locked:
+                # лок отпущен, а значения нет: загрузчик вернул None
+                # (его не кэшируем) или упал — дальше ждать нечего
+                logger.info(f"[CACHE MISS] {key} лок отпущен без значения, грузим из БД")
+                return await self._refresh(redis_client, key, loader, None, nx=True)
+
+        logger.info(f"[CACHE LOCK TIMEOUT] {key} грузим из БД без лока")
+        return await self._refresh(redis_client, key, loader, None, nx=True)
+
+    # nx — записать, только если ключа нет; expected — только если в ключе
+    # всё ещё это значение. Так загруженное до write-through или удаления
+    # не перетирает более новую запись
+    async def _refresh(self, redis_client: redis.Redis, key: str, loader, lock_token: Optional[str],
+                       nx: bool = False, expected: Optional[bytes] = None):
+        try:
+            payload = await loader()
+            # несуществующее не кэшируем, чтобы в Redis не копился мусор
+            if payload is not None:
+                entry = encode_entry(payload, self.ttl)
+                if expected is not None:
+                    stored = await redis_client.eval(_REPLACE_IF_SCRIPT, 1, key, expected, entry, redis_ttl(self.ttl))
+                else:
+                    stored = await redis_client.set(key, entry, ex=redis_ttl(self.ttl), nx=nx)
+                if stored:
+                    l1_cache.set(key, entry)
+                logger.info(f"[CACHE SET] {key} сохранён в Redis на {self.ttl}s")
+            return payload
+        finally:
+            if lock_token is not None:
+                await redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", lock_token)
+
+    async def _acquire_lock(self, redis_client: redis.Redis, key: str) -> Optional[str]:
+        token = secrets.token_hex(8)
+        acquired = await redis_client.set(f"lock:{key}", token, nx=True, px=settings.CACHE_LOCK_TIMEOUT_MS)
+        return token if acquired else None
+
+
+# Фоновая задача воркера: выкидывает из L1 ключи, изменённые другими
+# воркерами, и подхватывает новые версии namespace.
+# При обрыве соединения переподписывается, а L1 и запомненные версии
+# namespace сбрасывает целиком — сообщения за время обрыва потеряны.
+async def listen_invalidations(redis_client: redis.Redis) -> None:
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+            logger.info(f"[CACHE PUBSUB] Подписка на {settings.CACHE_INVALIDATION_CHANNEL}")
+            while True:
+                # ожидание с явным таймаутом: блокирующий listen() упирался бы
+                # в socket_timeout на тихом канале; заодно идёт health check
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None or message["type"] != "message":
+                    continue
+                data = json.loads(message["data"])
+                if data.get("origin") == WORKER_ID:
+                    continue
+                if "key" in data:
+                    l1_cache.delete(data["key"])
+                namespace = _namespaces.get(data.get("ns"))
+                if namespace is not None and "version" in data:
+                    namespace._set_version(data["version"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"[CACHE PUBSUB] Соединение потеряно: {e}, переподключение")
+            l1_cache.clear()
+            # смены версий за время обрыва тоже потеряны: перечитываем из Redis
+            for namespace in _namespaces.values():
+                namespace._version = None
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+
+
+news_cache = CacheNamespace("news", settings.NEWS_CACHE_TTL)
+news_feed_cache = CacheNamespace("news:feed", settings.NEWS_FEED_CACHE_TTL)
+news_search_cache = CacheNamespace("news:search", settings.NEWS_SEARCH_CACHE_TTL)
+user_cache = CacheNamespace("user", settings.USER_CACHE_TTL)
+# первая страница комментариев статьи, ключ — news_id
+comment_page_cache = CacheNamespace("comments:first", settings.COMMENTS_CACHE_TTL)
+# готовые тела ответов GET /news/{id} и GET /users/{id}
+news_response_cache = CacheNamespace("news:response", settings.NEWS_CACHE_TTL, generations=True)
+user_response_cache = CacheNamespace("user:response", settings.USER_CACHE_TTL, generations=True)
+# эпоха отзыва access-токенов пользователя (auth/claims.py): дольше токена хранить незачем
+auth_epoch_cache = CacheNamespace("auth:epoch", settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
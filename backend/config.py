@@ -1,3 +1,4 @@
+import json
 from pathlib import Path
 from typing import List
 from dotenv import load_dotenv
@@ -18,10 +19,61 @@ class Settings(BaseSettings):
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
 
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    JWT_CLAIMS_CACHE_SIZE: int = 10000   # проверенные access-токены в памяти воркера
+    # авторизация только по claims токена, без чтения пользователя; смена роли,
+    # верификации и удаление пользователя отзывают его access-токены
+    AUTH_STATELESS: bool = False
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
-    NEWS_CACHE_TTL: int = 300
-    USER_CACHE_TTL: int = 300
-    MAX_RETRIES: int = 5
+    MAX_SESSIONS_PER_USER: int = 20      # сверх лимита вытесняются сессии, которые истекают раньше всех
+    SESSION_IDLE_SECONDS: int = 24 * 3600          # сессии неактивных дольше пользователей уезжают из Redis в Postgres
+    SESSION_FLUSH_INTERVAL_SECONDS: int = 300
+    SESSION_FLUSH_BATCH: int = 500
+    # кэш сущностей обновляется при записи (write-through), поэтому TTL длинный
+    NEWS_CACHE_TTL: int = 6 * 3600
+    USER_CACHE_TTL: int = 6 * 3600
+    CACHE_VERSION_REFRESH_SECONDS: int = 60  # страховочное перечитывание версии namespace (обычно приходит по pub/sub)
+    CACHE_STALE_TTL: int = 60                # сколько отдавать устаревшую запись, пока её обновляют
+    CACHE_LOCK_TIMEOUT_MS: int = 3000        # лок на загрузку ключа из БД (между процессами)
+    CACHE_LOCK_POLL_MS: int = 25
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate"
+    L1_CACHE_MAX_ITEMS: int = 10000      # L1 — кэш внутри воркера перед Redis
+    L1_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    L1_CACHE_TTL: int = 30
+    CACHE_CODEC: str = "orjson"              # json, orjson, msgpack
+    CACHE_COMPRESSION: str = "zstd"          # none, zlib, zstd
+    CACHE_COMPRESSION_MIN_BYTES: int = 4096  # меньшие значения не сжимаются
+    HTTP_CACHE_CONTROL: str = "public, no-cache"  # браузер/CDN хранят, но ревалидируют по ETag
+    NEWS_PAGE_SIZE: int = 20
+    NEWS_PAGE_MAX_SIZE: int = 100
+    NEWS_FEED_CACHED_PAGES: int = 3      # сколько первых страниц ленты держим в Redis
+    NEWS_FEED_CACHE_TTL: int = 60
+    NEWS_RECENT_BUCKET_SECONDS: int = 60  # окно, внутри которого /news/recent отдаётся из одного ключа
+    NEWS_RECENT_MAX_DAYS: int = 30
+    NEWS_SEARCH_CACHE_TTL: int = 30     # популярные запросы поиска живут в Redis недолго
+    NEWS_SEARCH_MAX_PAGE: int = 50       # глубже offset-пагинация по рангу дорогая
+    COMMENTS_PAGE_SIZE: int = 20
+    COMMENTS_PAGE_MAX_SIZE: int = 100
+    COMMENTS_CACHE_TTL: int = 300
+    COMMENT_COUNT_RECONCILE_SECONDS: int = 3600  # период сверки news.comments_count с comments
+    COMMENT_COUNT_RECONCILE_BATCH: int = 10000
+    MAX_BATCH_IDS: int = 100             # лимит ?ids= в пакетных ручках
+    DB_POOL_SIZE: int = 10               # постоянные соединения на процесс
+    DB_MAX_OVERFLOW: int = 10            # временные сверх DB_POOL_SIZE
+    DB_POOL_TIMEOUT: float = 30.0        # сколько ждать соединение, потом TimeoutError
+    DB_POOL_RECYCLE: int = 1800          # пересоздавать соединения старше, сек (-1 — никогда)
+    DB_POOL_PRE_PING: bool = True
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100  # кэш prepared statements asyncpg на соединение (0 — выкл, нужно за pgbouncer)
+    DB_CONNECT_TIMEOUT: float = 5.0      # установка соединения с Postgres
+    DB_COMMAND_TIMEOUT: float = 30.0     # потолок на один запрос asyncpg
+    REDIS_MAX_CONNECTIONS: int = 50      # на процесс; при исчерпании ждём REDIS_POOL_TIMEOUT
+    REDIS_POOL_TIMEOUT: float = 2.0
+    REDIS_SOCKET_TIMEOUT: float = 2.0    # команда, зависшая дольше, падает, а не вешает запрос
+    REDIS_CONNECT_TIMEOUT: float = 2.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    REDIS_WARMUP_CONNECTIONS: int = 10   # соединения, открываемые при старте
+    MAX_RETRIES: int = 5                 # попытки подключения к Redis/Postgres при старте
+    RETRY_BACKOFF_BASE: float = 0.5
+    RETRY_BACKOFF_MAX: float = 10.0
     DEBUG: bool = False
 
     PORT: int = 8000
@@ -34,6 +86,20 @@ class Settings(BaseSettings):
     ARGON2_MEMORY_COST: int = 65536    # 64 MiB
     ARGON2_PARALLELISM: int = 1
 
+    PASSWORD_HASH_WORKERS: int = 2        # процессов в пуле Argon2
+    PASSWORD_HASH_QUEUE_SIZE: int = 100   # сколько задач может ждать сверх воркеров
+    PASSWORD_HASH_TIMEOUT: float = 10.0   # секунд на один hash/verify
+    PASSWORD_HASH_MAX_WAIT: float = 2.0   # при большей ожидаемой очереди сразу 503, а не ждать таймаута
+
+    # token bucket в Redis: пополнение в минуту и ёмкость корзины
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_LOGIN_IP_PER_MINUTE: int = 120   # с запасом на NAT; подбор пароля держит лимит на логин
+    RATE_LIMIT_LOGIN_IP_BURST: int = 60
+    RATE_LIMIT_LOGIN_USER_PER_MINUTE: int = 5   # подбор пароля к одному логину
+    RATE_LIMIT_LOGIN_USER_BURST: int = 5
+    RATE_LIMIT_REGISTER_IP_PER_MINUTE: int = 10 # регистрация и создание пользователей админом
+    RATE_LIMIT_REGISTER_IP_BURST: int = 20
+
     @field_validator(
         "SECRET_KEY",
         "REFRESH_SECRET_KEY",
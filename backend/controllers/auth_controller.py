@@ -10,6 +10,7 @@ from schemas.user import UserCreate, UserResponse
 from schemas.auth import LoginRequest, TokenResponse
 from auth.auth import get_current_user
 from models.user import User
+from utils.rate_limit import rate_limiter, client_ip, login_key, LOGIN_IP_BUDGET, LOGIN_USER_BUDGET, REGISTER_IP_BUDGET
 
 router = APIRouter()
 
@@ -18,15 +19,17 @@ async def get_auth_service(
     redis: Redis = Depends(get_redis)
 ) -> AuthService:
     user_repo = UserRepository(db, redis)
-    refresh_token_repo = RefreshTokenRepository(redis)
+    refresh_token_repo = RefreshTokenRepository(db, redis)
     return AuthService(user_repo, refresh_token_repo)
 
 @router.post("/auth/register", response_model=UserResponse)
 async def register(
     user_data: UserCreate,
     request: Request,
-    service: AuthService = Depends(get_auth_service)
+    service: AuthService = Depends(get_auth_service),
+    redis: Redis = Depends(get_redis)
 ):
+    await rate_limiter.check(redis, "register", {client_ip(request): REGISTER_IP_BUDGET})
     user_agent = request.headers.get("user-agent", "Unknown")
     user = await service.register(user_data.dict(), user_agent)
     return user
@@ -35,13 +38,20 @@ async def register(
 @router.post("/auth/login", response_model=TokenResponse)
 async def login(
     request: Request,
-    service: AuthService = Depends(get_auth_service)
+    service: AuthService = Depends(get_auth_service),
+    redis: Redis = Depends(get_redis)
 ):
     try:
         login_data = LoginRequest(**await request.json())
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid request body")
 
+    # до Argon2: и с одного адреса, и к одному логину
+    await rate_limiter.check(redis, "login", {
+        f"ip:{client_ip(request)}": LOGIN_IP_BUDGET,
+        f"user:{login_key(login_data.login)}": LOGIN_USER_BUDGET,
+    })
+
     user_agent = request.headers.get("user-agent", "Unknown")
     access_token, refresh_token_jwt = await service.login(
         login_data.login, login_data.password, user_agent
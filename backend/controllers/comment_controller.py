@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from redis.asyncio import Redis
 from database import get_db
@@ -6,12 +6,13 @@ from cache import get_redis
 from services.comment_service import CommentService
 from repositories.comment_repository import CommentRepository
 from repositories.news_repository import NewsRepository
-from schemas.comment import CommentCreate, CommentUpdate, CommentResponse
+from schemas.comment import CommentCreate, CommentUpdate, CommentResponse, CommentPage
 from auth.auth import get_current_user
 from models.user import User
-from auth.resolvers import get_comment_or_404_with_permission
 from models.comment import Comment
 from models.news import News
+from utils.http_cache import conditional_response
+from config import settings
 
 from typing import List, Optional
 
@@ -22,7 +23,7 @@ async def get_comment_service(
     redis: Redis = Depends(get_redis)
 ) -> CommentService:
     news_repo = NewsRepository(db, redis)
-    comment_repo = CommentRepository(db)
+    comment_repo = CommentRepository(db, redis)
     return CommentService(comment_repo, news_repo)
 
 @router.post("/comments", response_model=CommentResponse)
@@ -37,37 +38,43 @@ async def create_comment(
 @router.get("/comments/{comment_id}", response_model=CommentResponse)
 async def get_comment(
     comment_id: int,
+    request: Request,
     service: CommentService = Depends(get_comment_service)
 ):
     comment = await service.get_comment(comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
-    return comment
+    body = CommentResponse.model_validate(comment).model_dump_json().encode()
+    return conditional_response(request, body)
 
-@router.get("/comments", response_model=List[CommentResponse])
+@router.get("/comments", response_model=CommentPage)
 async def list_comments(
+    request: Request,
     news_id: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(settings.COMMENTS_PAGE_SIZE, ge=1, le=settings.COMMENTS_PAGE_MAX_SIZE),
     service: CommentService = Depends(get_comment_service)
 ):
-    return await service.list_comments(news_id)
+    comments_page = await service.list_comments(news_id, cursor, limit)
+    body = CommentPage.model_validate(comments_page).model_dump_json().encode()
+    return conditional_response(request, body, weak=True)
 
 @router.put("/comments/{comment_id}", response_model=CommentResponse)
 async def update_comment(
     comment_id: int,
     comment_data: CommentUpdate,
+    # авторство проверяется в WHERE самого UPDATE, без предварительного SELECT
     current_user: User = Depends(get_current_user),
-    comment: Comment = Depends(get_comment_or_404_with_permission),
     service: CommentService = Depends(get_comment_service)
 ):
-    updated_comment = await service.update_comment(comment, comment_data.dict(exclude_unset=True))
+    updated_comment = await service.update_comment(current_user, comment_id, comment_data.dict(exclude_unset=True))
     return updated_comment
 
 @router.delete("/comments/{comment_id}")
 async def delete_comment(
     comment_id: int,
     current_user: User = Depends(get_current_user),
-    comment: Comment = Depends(get_comment_or_404_with_permission),
     service: CommentService = Depends(get_comment_service)
 ):
-    await service.delete_comment(comment)
+    await service.delete_comment(current_user, comment_id)
     return {"message": "Comment deleted"}
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+from auth.auth import get_current_admin
+from auth.claims import claims_cache
+from models.user import User
+from utils.password import password_hasher
+from cache import l1_cache
+from utils.db_metrics import route_connection_stats
+from utils.db_pool import pool_metrics
+from utils.rate_limit import rate_limiter
+from database import engine
+
+router = APIRouter()
+
+# внутренние метрики воркера, смотреть может только админ
+@router.get("/metrics")
+async def get_metrics(
+    current_user: User = Depends(get_current_admin)
+):
+    return {
+        "password_hasher": password_hasher.metrics(),
+        "l1_cache": l1_cache.metrics(),
+        "jwt_claims_cache": claims_cache.metrics(),
+        "rate_limiter": rate_limiter.metrics(),
+        "db_pool": pool_metrics(engine.pool),
+        "db_connections_by_route": route_connection_stats.metrics(),
+    }
@@ -1,17 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from redis.asyncio import Redis
 from database import get_db
 from cache import get_redis
 from services.news_service import NewsService
-from schemas.news import NewsCreate, NewsUpdate, NewsResponse
+from schemas.news import NewsCreate, NewsUpdate, NewsResponse, NewsSummary, NewsPage, NewsSearchPage
 from models.user import User
-from auth.resolvers import get_news_or_404_with_permission, verify_user_can_create_news
+from auth.auth import get_current_user
+from auth.resolvers import verify_user_can_create_news
 from models.news import News
 from repositories.news_repository import NewsRepository
+from config import settings
+
+from utils.query import parse_id_list
+from utils.http_cache import conditional_response
+
+from typing import Optional, List, Union
 
 router = APIRouter()
 
+_news_list_adapter = TypeAdapter(List[NewsResponse])
+_news_summary_adapter = TypeAdapter(List[NewsSummary])
+
 async def get_news_service(
     db: AsyncSession = Depends(get_db),
     redis: Redis = Depends(get_redis)
@@ -29,37 +40,74 @@ async def create_news(
     news = await service.create_news(current_user, news_data.dict())
     return news
 
+# /news/search и /news/recent объявлены до /news/{news_id}, иначе "search" уйдёт в news_id и получит 422
+@router.get("/news/search", response_model=NewsSearchPage)
+async def search_news(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    page: int = Query(0, ge=0, le=settings.NEWS_SEARCH_MAX_PAGE),
+    limit: int = Query(settings.NEWS_PAGE_SIZE, ge=1, le=settings.NEWS_PAGE_MAX_SIZE),
+    service: NewsService = Depends(get_news_service)
+):
+    results = await service.search_news(q, page, limit)
+    body = NewsSearchPage.model_validate(results).model_dump_json().encode()
+    return conditional_response(request, body, weak=True)
+
+@router.get("/news/recent", response_model=List[NewsSummary])
+async def get_recent_news(
+    request: Request,
+    days: int = Query(1, ge=1, le=settings.NEWS_RECENT_MAX_DAYS),
+    limit: int = Query(settings.NEWS_PAGE_SIZE, ge=1, le=settings.NEWS_PAGE_MAX_SIZE),
+    service: NewsService = Depends(get_news_service)
+):
+    news = await service.get_recent_news(days, limit)
+    body = _news_summary_adapter.dump_json(_news_summary_adapter.validate_python(news))
+    return conditional_response(request, body, weak=True)
+
 @router.get("/news/{news_id}", response_model=NewsResponse)
 async def get_news(
     news_id: int,
+    request: Request,
     service: NewsService = Depends(get_news_service)
 ):
-    news = await service.get_news(news_id)
-    if not news:
+    cached = await service.get_news_response(news_id)
+    if cached is None:
         raise HTTPException(status_code=404, detail="News not found")
-    return news
+    return conditional_response(request, cached.body, cached.etag)
 
-@router.get("/news")
+# ?ids=1,2,3 — пакетное получение полных новостей вместо ленты
+@router.get("/news", response_model=Union[NewsPage, List[NewsResponse]])
 async def list_news(
+    request: Request,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(settings.NEWS_PAGE_SIZE, ge=1, le=settings.NEWS_PAGE_MAX_SIZE),
+    ids: Optional[str] = Query(None),
     service: NewsService = Depends(get_news_service)
 ):
-    return await service.list_news()
+    if ids is not None:
+        news = await service.get_news_many(parse_id_list(ids))
+        body = _news_list_adapter.dump_json(_news_list_adapter.validate_python(news, from_attributes=True))
+    else:
+        news_page = await service.list_news(cursor, limit)
+        body = NewsPage.model_validate(news_page).model_dump_json().encode()
+    return conditional_response(request, body, weak=True)
 
 @router.put("/news/{news_id}", response_model=NewsResponse)
 async def update_news(
     news_id: int,
     news_data: NewsUpdate,
-    news: News = Depends(get_news_or_404_with_permission),
+    # авторство проверяется в WHERE самого UPDATE, без предварительного SELECT
+    current_user: User = Depends(get_current_user),
     service: NewsService = Depends(get_news_service)
 ):
-    updated_news = await service.update_news(news, news_data.dict(exclude_unset=True))
+    updated_news = await service.update_news(current_user, news_id, news_data.dict(exclude_unset=True))
     return updated_news
 
 @router.delete("/news/{news_id}")
 async def delete_news(
     news_id: int,
-    news: News = Depends(get_news_or_404_with_permission),
+    current_user: User = Depends(get_current_user),
     service: NewsService = Depends(get_news_service)
 ):
-    await service.delete_news(news)
+    await service.delete_news(current_user, news_id)
     return {"message": "News deleted"}
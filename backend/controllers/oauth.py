@@ -24,7 +24,7 @@ async def get_auth_service(
     redis: Redis = Depends(get_redis)
 ) -> AuthService:
     user_repo = UserRepository(db, redis)
-    refresh_token_repo = RefreshTokenRepository(redis)
+    refresh_token_repo = RefreshTokenRepository(db, redis)
     return AuthService(user_repo, refresh_token_repo)
 
 # --- OAuth Login (redirect to GitHub) ---
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from redis.asyncio import Redis
 from repositories.user_repository import UserRepository
@@ -6,12 +7,18 @@ from database import get_db
 from cache import get_redis
 from services.user_service import UserService
 from schemas.user import UserCreate, UserUpdate, UserResponse
-from auth.auth import get_current_user, get_current_admin
+from auth.auth import get_current_user, get_current_admin, get_current_user_optional
 from models.user import User
-from auth.resolvers import get_user_or_404_with_permission
+from utils.query import parse_id_list
+from utils.rate_limit import rate_limiter, client_ip, REGISTER_IP_BUDGET
+from utils.http_cache import conditional_response
+
+from typing import Optional, List
 
 router = APIRouter()
 
+_user_list_adapter = TypeAdapter(List[UserResponse])
+
 async def get_user_service(
     db: AsyncSession = Depends(get_db),
     redis: Redis = Depends(get_redis)
@@ -22,10 +29,13 @@ async def get_user_service(
 @router.post("/users", response_model=UserResponse)
 async def create_user(
     user_data: UserCreate,
+    request: Request,
     # создать пользователя может только админ
     current_user: User = Depends(get_current_admin), 
-    service: UserService = Depends(get_user_service)
+    service: UserService = Depends(get_user_service),
+    redis: Redis = Depends(get_redis)
 ):
+    await rate_limiter.check(redis, "register", {client_ip(request): REGISTER_IP_BUDGET})
     user = await service.create_user(user_data.dict())
     return user
 
@@ -35,17 +45,30 @@ async def get_user(
     # получить пользователя может только админ или сам пользователь
     # не акутально, в виду front, теперь даём всем имена
     # user: User = Depends(get_user_or_404_with_permission),
+    request: Request,
     service: UserService = Depends(get_user_service)
 ):
-    user = await service.get_user(user_id)
-    return user
+    cached = await service.get_user_response(user_id)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return conditional_response(request, cached.body, cached.etag)
 
 @router.get("/users")
 async def list_users(
-    # получить список пользователей может только админ
-    current_user: User = Depends(get_current_admin),
+    # ?ids=1,2,3 — публичные профили пачкой (как /users/{id}),
+    # полный список пользователей может получить только админ
+    request: Request,
+    ids: Optional[str] = Query(None),
+    current_user: Optional[User] = Depends(get_current_user_optional),
     service: UserService = Depends(get_user_service)
 ):
+    if ids is not None:
+        users = await service.get_users_many(parse_id_list(ids))
+        return conditional_response(request, _user_list_adapter.dump_json(_user_list_adapter.validate_python(users, from_attributes=True)), weak=True)
+    if current_user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     return await service.list_users()
 
 @router.put("/users/{user_id}", response_model=UserResponse)
@@ -53,18 +76,18 @@ async def update_user(
     user_id: int,
     user_update_data: UserUpdate,
     # обновить пользователя может только админ или сам пользователь
-    user: User = Depends(get_user_or_404_with_permission),
+    current_user: User = Depends(get_current_user),
     service: UserService = Depends(get_user_service)
 ):
-    updated_user = await service.update_user(user.id, user_update_data.dict(exclude_unset=True))
+    updated_user = await service.update_user(current_user, user_id, user_update_data.dict(exclude_unset=True))
     return updated_user
 
 @router.delete("/users/{user_id}")
 async def delete_user(
     user_id: int,
     # удалить пользователя может только админ или сам пользователь
-    user: User = Depends(get_user_or_404_with_permission),
+    current_user: User = Depends(get_current_user),
     service: UserService = Depends(get_user_service)
 ):
-    await service.delete_user(user.id)
+    await service.delete_user(current_user, user_id)
     return {"message": "User deleted"}
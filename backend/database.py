@@ -1,12 +1,51 @@
+import asyncio
+import logging
+
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import settings
+from utils.db_pool import TimedAsyncAdaptedQueuePool
+from utils.retry import retry_async
+
+logger = logging.getLogger("uvicorn")
 
-engine = create_async_engine(settings.DATABASE_URL)
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    poolclass=TimedAsyncAdaptedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        "timeout": settings.DB_CONNECT_TIMEOUT,
+        "command_timeout": settings.DB_COMMAND_TIMEOUT,
+    },
+)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 Base = declarative_base()
 
+
+async def _ping_db():
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+# вызывается из lifespan: ждёт Postgres и заранее открывает DB_POOL_SIZE
+# соединений, чтобы первые запросы не платили за подключение
+async def init_db() -> None:
+    await retry_async(_ping_db, "Postgres")
+    await asyncio.gather(*[_ping_db() for _ in range(settings.DB_POOL_SIZE)])
+    logger.info(f"[DB] Подключено, открыто соединений: {engine.pool.checkedin()}")
+
+async def close_db() -> None:
+    await engine.dispose()
+
+# сессия ленивая: соединение из пула берётся на первом запросе в БД
+# и возвращается при закрытии, поэтому ответы из кэша пул не занимают
+# (проверяется по db_connections_by_route в /metrics)
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
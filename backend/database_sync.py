@@ -1,8 +1,18 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import settings
+from utils.db_pool import TimedQueuePool
 
-engine = create_engine(settings.DATABASE_URL.replace("+asyncpg", "+psycopg2"))
+# у psycopg2 нет кэша prepared statements, остальное как у async-движка
+engine = create_engine(
+    settings.DATABASE_URL.replace("+asyncpg", "+psycopg2"),
+    poolclass=TimedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
 
 SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
 
@@ -1,4 +1,7 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from config import settings
@@ -8,9 +11,36 @@ from controllers.news_controller import router as news_router
 from controllers.comment_controller import router as comment_router
 from controllers.auth_controller import router as auth_router
 from controllers.oauth import router as oauth_router
+from controllers.metrics_controller import router as metrics_router
+from utils.password import password_hasher
+from cache import init_redis, close_redis, listen_invalidations
+from tasks import flush_idle_sessions_periodically, reconcile_comment_counts_periodically
+from database import engine, init_db, close_db
+from utils import sql_stats
+from utils.db_metrics import route_connection_stats
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    password_hasher.start()
+    # Redis и Postgres поднимаются до приёма запросов: с ретраями и прогревом пулов
+    redis_client = await init_redis()
+    await init_db()
+    background_tasks = [
+        asyncio.create_task(listen_invalidations(redis_client)),
+        asyncio.create_task(reconcile_comment_counts_periodically(redis_client)),
+        asyncio.create_task(flush_idle_sessions_periodically(redis_client)),
+    ]
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await close_redis()
+    await close_db()
+    password_hasher.shutdown()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 allow_origins = [str(url).rstrip("/") for url in settings.BACKEND_CORS_ORIGINS]
 
@@ -22,12 +52,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+route_connection_stats.install(engine)
+
+@app.middleware("http")
+async def count_db_connections(request: Request, call_next):
+    checkouts = route_connection_stats.start()
+    response = await call_next(request)
+    # шаблон маршрута, а не путь: /news/{news_id}, а не /news/42
+    route = request.scope.get("route")
+    route_connection_stats.record(f"{request.method} {route.path if route else 'unmatched'}", checkouts[0])
+    return response
+
+# в DEBUG каждый ответ несёт число SQL-запросов, которые он породил;
+# на этом заголовке построены тесты tests/test_sql_statements.py
+if settings.DEBUG:
+    sql_stats.install(engine)
+
+    @app.middleware("http")
+    async def count_sql_statements(request: Request, call_next):
+        statements = sql_stats.start()
+        response = await call_next(request)
+        response.headers[sql_stats.STATEMENTS_HEADER] = str(len(statements))
+        return response
+
 
 app.include_router(user_router, prefix="/api/v1")
 app.include_router(news_router, prefix="/api/v1")
 app.include_router(comment_router, prefix="/api/v1")
 app.include_router(auth_router, prefix="/api/v1")
 app.include_router(oauth_router, prefix="/api/v1")
+app.include_router(metrics_router, prefix="/api/v1")
 
 
 @app.get("/")
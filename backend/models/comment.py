@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from database import Base
 
@@ -9,4 +9,8 @@ class Comment(Base):
     text = Column(String(500), nullable=False)
     news_id = Column(Integer, ForeignKey("news.id", ondelete="CASCADE"), nullable=False)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    published_at = Column(DateTime, default=func.now())
+    published_at = Column(DateTime, nullable=False, default=func.now(), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_comments_news_id_published_at_id", news_id, published_at, id),
+    )
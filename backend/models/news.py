@@ -1,14 +1,36 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Computed
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from database import Base
 
+# конфигурация полнотекстового поиска; запрос должен использовать ту же, что и колонка
+SEARCH_CONFIG = "russian"
+
 class News(Base):
     __tablename__ = "news"
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
     content = Column(JSONB, nullable=False)
-    published_at = Column(DateTime, default=func.now())
+    published_at = Column(DateTime, nullable=False, default=func.now(), server_default=func.now())
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     cover_url = Column(String(255), nullable=True)
+    # денормализованный счётчик: меняется в одной транзакции с комментарием,
+    # дрейф правит периодическая сверка (tasks.reconcile_comment_counts)
+    comments_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # заголовок весит больше текста; из content берутся только строковые узлы JSON.
+    # deferred: вектор нужен только в WHERE поиска, в select(News) он не грузится
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(title, '')), 'A') || "
+            f"setweight(jsonb_to_tsvector('{SEARCH_CONFIG}'::regconfig, content, '[\"string\"]'), 'B')",
+            persisted=True,
+        ),
+    ))
+
+    __table_args__ = (
+        Index("ix_news_published_at_id", published_at.desc(), id.desc()),
+        Index("ix_news_search_vector", "search_vector", postgresql_using="gin"),
+    )
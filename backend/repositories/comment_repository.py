@@ -1,44 +1,138 @@
+from datetime import datetime
+from sqlalchemy import tuple_, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
+from redis.asyncio import Redis
 from sqlalchemy.future import select
 from models.comment import Comment
+from models.news import News
 from repositories.base import Repository
+from cache import comment_page_cache
+from utils.pagination import encode_cursor, decode_cursor
+from utils.identity_map import RequestIdentityMap
+from config import settings
+import logging
 
 from typing import Optional
 
+logger = logging.getLogger("uvicorn")
+
+
+def _comment_to_cache(comment: Comment) -> dict:
+    return {
+        "id": comment.id,
+        "text": comment.text,
+        "news_id": comment.news_id,
+        "author_id": comment.author_id,
+        "published_at": comment.published_at.isoformat() if comment.published_at else None
+    }
+
+def _page(rows, limit: int, page: int) -> dict:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        published_at = datetime.fromisoformat(last["published_at"]) if last["published_at"] else None
+        next_cursor = encode_cursor(published_at, last["id"], page)
+    return {"items": rows, "next_cursor": next_cursor}
+
+
 class CommentRepository(Repository):
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, redis: Redis):
         self.db = db
+        self.redis = redis
+        self.entities = RequestIdentityMap(db)
 
     async def get(self, id: int):
-        result = await self.db.execute(select(Comment).where(Comment.id == id))
-        return result.scalars().first()
+        comment = self.entities.get_loaded(Comment, id)
+        if comment is not None:
+            return comment
+        return await self.db.get(Comment, id)
 
-    async def list(self, news_id: Optional[int] = None):
+    # keyset-пагинация по (published_at, id) от старых к новым,
+    # для news_id идёт по индексу ix_comments_news_id_published_at_id.
+    # Первая страница статьи кэшируется одним ключом на COMMENTS_PAGE_MAX_SIZE + 1
+    # строк и режется под любой limit, поэтому её проще инвалидировать
+    async def list(self, news_id: Optional[int] = None, cursor: Optional[str] = None,
+                   limit: int = settings.COMMENTS_PAGE_SIZE):
+        after = decode_cursor(cursor) if cursor else None
+        page = after[2] + 1 if after else 0
+
+        if news_id and not after:
+            rows = await comment_page_cache.get_or_load(
+                self.redis, news_id, lambda: self._load_rows(news_id, None, settings.COMMENTS_PAGE_MAX_SIZE + 1)
+            )
+            return _page(rows, limit, page)
+
+        return _page(await self._load_rows(news_id, after, limit + 1), limit, page)
+
+    async def _load_rows(self, news_id: Optional[int], after, limit: int):
+        query = select(Comment).order_by(Comment.published_at, Comment.id).limit(limit)
         if news_id:
-             result = await self.db.execute(select(Comment).where(Comment.news_id == news_id))
-        else:
-             result = await self.db.execute(select(Comment))
-        return result.scalars().all()
+            query = query.where(Comment.news_id == news_id)
+        if after:
+            query = query.where(tuple_(Comment.published_at, Comment.id) > (after[0], after[1]))
+
+        logger.info(f"[DB QUERY] Комментарии к новости {news_id} получены из БД")
+        result = await self.db.execute(query)
+        return [_comment_to_cache(comment) for comment in result.scalars().all()]
 
     async def create(self,  data):
         comment = Comment(**data)
         self.db.add(comment)
+        await self._add_to_counter(comment.news_id, 1)
         await self.db.commit()
         await self.db.refresh(comment)
+        await self._invalidate(comment.news_id)
         return comment
 
-    async def update(self, id: int,  data):
-        comment = await self.get(id)
-        if comment:
-            for key, value in data.items():
-                setattr(comment, key, value)
+    async def exists(self, id: int) -> bool:
+        result = await self.db.execute(select(Comment.id).where(Comment.id == id))
+        return result.scalar() is not None
+
+    # как в NewsRepository: один UPDATE ... RETURNING, авторство проверяется в WHERE
+    async def update(self, id: int,  data, owner_id: Optional[int] = None):
+        if not data:
+            query = select(Comment).where(Comment.id == id)
+        else:
+            query = update(Comment).where(Comment.id == id).values(**data).returning(Comment)
+        if owner_id is not None:
+            query = query.where(Comment.author_id == owner_id)
+
+        result = await self.db.execute(query)
+        comment = result.scalars().first()
+        if comment and data:
             await self.db.commit()
-            await self.db.refresh(comment)
+            await self._invalidate(comment.news_id)
         return comment
 
-    async def delete(self, id: int):
-        comment = await self.get(id)
-        if comment:
-            await self.db.delete(comment)
+    # DELETE и уменьшение счётчика — один statement:
+    # WITH deleted AS (DELETE ... RETURNING) UPDATE news ... FROM deleted RETURNING.
+    # Возвращает news_id удалённого комментария или None
+    async def delete(self, id: int, owner_id: Optional[int] = None) -> Optional[int]:
+        deleted = delete(Comment).where(Comment.id == id)
+        if owner_id is not None:
+            deleted = deleted.where(Comment.author_id == owner_id)
+        deleted = deleted.returning(Comment.news_id).cte("deleted")
+
+        result = await self.db.execute(
+            update(News)
+            .where(News.id == deleted.c.news_id)
+            .values(comments_count=News.comments_count - 1)
+            .returning(deleted.c.news_id)
+        )
+        news_id = result.scalar()
+        if news_id is not None:
             await self.db.commit()
-        return comment
+            await self._invalidate(news_id)
+        return news_id
+
+    # счётчик меняется в той же транзакции, что и сам комментарий;
+    # UPDATE ... SET x = x + delta не теряет конкурентные изменения
+    async def _add_to_counter(self, news_id: int, delta: int):
+        await self.db.execute(
+            update(News).where(News.id == news_id).values(comments_count=News.comments_count + delta)
+        )
+
+    async def _invalidate(self, news_id: int):
+        await comment_page_cache.delete(self.redis, news_id)
+        logger.info(f"[CACHE DELETE] Первая страница комментариев к новости {news_id} удалена из Redis")
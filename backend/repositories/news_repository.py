@@ -1,101 +1,304 @@
-from datetime import datetime
+import hashlib
+import time
+from datetime import datetime, timedelta
+from typing import Optional, List
+from sqlalchemy import tuple_, func, literal_column, text, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from redis.asyncio import Redis
 from sqlalchemy.future import select
-from models.news import News
+from models.news import News, SEARCH_CONFIG
 from repositories.base import Repository
+from cache import news_cache, news_feed_cache, news_search_cache, news_response_cache, comment_page_cache
+from utils.pagination import encode_cursor, decode_cursor
+from utils.identity_map import RequestIdentityMap
 from config import settings
 import logging
-import json
 
 logger = logging.getLogger("uvicorn")
 
+
+def _news_to_cache(news: News) -> dict:
+    return {
+        "id": news.id,
+        "title": news.title,
+        "content": news.content,  # Dict[str, Any]
+        "published_at": news.published_at.isoformat() if news.published_at else None,
+        "author_id": news.author_id,
+        "cover_url": news.cover_url,
+        "comments_count": news.comments_count or 0
+    }
+
+# колонки элемента ленты: без content
+_SUMMARY_COLUMNS = (News.id, News.title, News.published_at, News.author_id, News.cover_url, News.comments_count)
+
+def _summary_to_cache(row) -> dict:
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "published_at": row["published_at"].isoformat() if row["published_at"] else None,
+        "author_id": row["author_id"],
+        "cover_url": row["cover_url"],
+        "comments_count": row["comments_count"]
+    }
+
+def _news_from_cache(data: dict) -> News:
+    return News(
+        id=data["id"],
+        title=data["title"],
+        content=data["content"],
+        published_at=datetime.fromisoformat(data["published_at"]) if data["published_at"] else None,
+        author_id=data["author_id"],
+        cover_url=data["cover_url"],
+        comments_count=data.get("comments_count", 0)
+    )
+
+
 class NewsRepository(Repository):
     def __init__(self, db: AsyncSession, redis: Redis):
         self.db = db
         self.redis = redis
+        self.entities = RequestIdentityMap(db)
 
     async def get(self, id: int):
+        news = self.entities.get_loaded(News, id)
+        if news is not None:
+            logger.info(f"[IDENTITY MAP] News {id} уже загружена в этом запросе")
+            return news
         logger.info(f"[DB QUERY, cache restricted] News {id} получена из БД")
-        result = await self.db.execute(select(News).where(News.id == id))
-        news = result.scalars().first()
-
-        return news
+        return await self.db.get(News, id)
 
+    # промах защищён от thundering herd: один запрос в БД на ключ,
+    # остальные ждут его или получают устаревшее значение
     async def get_cached(self, id: int):
-        cache_key = f"news:{id}"
-
-        cached_data = await self.redis.get(cache_key)
-        if cached_data:
-            data = json.loads(cached_data) 
-
-            logger.info(f"[CACHE HIT] News {id} получена из Redis")
-            news = News(
-                id=data["id"],
-                title=data["title"],
-                content=data["content"],
-                published_at=datetime.fromisoformat(data["published_at"]) if data["published_at"] else None,
-                author_id=data["author_id"],
-                cover_url=data["cover_url"]
-            )
-
+        news = self.entities.get(News, id)
+        if news is not None:
             return news
-  
+        data = await news_cache.get_or_load(self.redis, id, lambda: self._load_for_cache(id))
+        if not data:
+            return None
+        news = _news_from_cache(data)
+        self.entities.add_cached(News, id, news)
+        return news
 
+    async def _load_for_cache(self, id: int):
         logger.info(f"[DB QUERY] News {id} получена из БД")
         result = await self.db.execute(select(News).where(News.id == id))
         news = result.scalars().first()
+        return _news_to_cache(news) if news else None
 
-        # чтобы в Redis не добавлялся мусор несуществующий
-        if not news:
-            return None
+    # готовое тело ответа GET /news/{id}, рендерит его сервис
+    async def get_cached_response(self, id: int) -> Optional[bytes]:
+        return await news_response_cache.get_raw(self.redis, id)
 
-        data_to_cache = {
-            "id": news.id,
-            "title": news.title,
-            "content": news.content,  # Dict[str, Any]
-            "published_at": news.published_at.isoformat() if news.published_at else None,
-            "author_id": news.author_id,
-            "cover_url": news.cover_url
-        }
+    async def set_cached_response(self, id: int, body: bytes):
+        await news_response_cache.set_raw(self.redis, id, body)
 
-        logger.info(f"[CACHE SET] News {id} сохранена в Redis на {settings.NEWS_CACHE_TTL}s")
-        await self.redis.set(cache_key, json.dumps(data_to_cache), ex=settings.NEWS_CACHE_TTL)
+    # запись тела, собранного из кэша сущности на промахе: не состоится,
+    # если с момента cached_response_generation тело обновили или удалили
+    async def cached_response_generation(self, id: int) -> bytes:
+        return await news_response_cache.generation(self.redis, id)
 
-        return news
+    async def add_cached_response(self, id: int, body: bytes, generation: bytes):
+        await news_response_cache.set_raw_if_generation(self.redis, id, body, generation)
+
+    # пакетная версия get_cached: один MGET, один IN-запрос на промахи
+    # и одна пачка SET в pipeline; порядок ответа как в ids, отсутствующие пропускаются
+    async def get_many_cached(self, ids: List[int]):
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+
+        found = await news_cache.get_many(self.redis, ids)
+        missing = [id for id in ids if id not in found]
+        logger.info(f"[CACHE HIT] {len(found)} из {len(ids)} новостей получены из Redis")
+
+        if missing:
+            logger.info(f"[DB QUERY] Новости {missing} получены из БД")
+            result = await self.db.execute(select(News).where(News.id.in_(missing)))
+            loaded = {news.id: _news_to_cache(news) for news in result.scalars().all()}
+            # nx: не перетираем более свежую запись от write-through
+            await news_cache.set_many(self.redis, loaded, nx=True)
+            found.update(loaded)
+
+        return [_news_from_cache(found[id]) for id in ids if id in found]
+
+    # cutoff округляется до начала бакета, поэтому все запросы внутри
+    # NEWS_RECENT_BUCKET_SECONDS попадают в один ключ; запись новости
+    # инвалидирует namespace ленты целиком
+    async def get_recent(self, days: int, limit: int = settings.NEWS_PAGE_SIZE):
+        bucket = int(time.time()) // settings.NEWS_RECENT_BUCKET_SECONDS
+        return await news_feed_cache.get_or_load(
+            self.redis, f"recent:{days}:{limit}:{bucket}", lambda: self._load_recent(days, limit, bucket)
+        )
+
+    async def _load_recent(self, days: int, limit: int, bucket: int):
+        cutoff = datetime.utcfromtimestamp(bucket * settings.NEWS_RECENT_BUCKET_SECONDS) - timedelta(days=days)
+        # тот же порядок, что у индекса ix_news_published_at_id: range scan + LIMIT
+        result = await self.db.execute(
+            select(*_SUMMARY_COLUMNS)
+            .where(News.published_at >= cutoff)
+            .order_by(News.published_at.desc(), News.id.desc())
+            .limit(limit)
+        )
+        logger.info(f"[DB QUERY] Новости за {days} дн. получены из БД")
+        return [_summary_to_cache(row) for row in result.mappings().all()]
+
+    # поиск по заголовку и тексту: ранжирование ts_rank_cd, offset-пагинация по странице.
+    # Инвалидации нет — запросы живут NEWS_SEARCH_CACHE_TTL
+    async def search(self, q: str, page: int = 0, limit: int = settings.NEWS_PAGE_SIZE):
+        normalized = " ".join(q.lower().split())
+        digest = hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
+        return await news_search_cache.get_or_load(
+            self.redis, f"{digest}:{page}:{limit}", lambda: self._load_search(normalized, page, limit)
+        )
 
-    async def get_recent(self, days: int):
-        cutoff = datetime.utcnow() - timedelta(days=days)
+    async def _load_search(self, q: str, page: int, limit: int):
+        query = func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), q)
+        rank = func.ts_rank_cd(News.search_vector, query)
         result = await self.db.execute(
-            select(News).where(News.published_at >= cutoff)
+            select(*_SUMMARY_COLUMNS)
+            .where(News.search_vector.op("@@")(query))
+            .order_by(rank.desc(), News.id.desc())
+            .offset(page * limit)
+            .limit(limit + 1)
         )
-        
-        return result.scalars().all()
+        rows = result.mappings().all()
+        logger.info(f"[DB QUERY] Поиск '{q}', страница {page} получен из БД")
 
-    async def list(self):
-        result = await self.db.execute(select(News))
-        return result.scalars().all()
+        return {
+            "items": [_summary_to_cache(row) for row in rows[:limit]],
+            "next_page": page + 1 if len(rows) > limit else None
+        }
+
+    # лента: keyset-пагинация по (published_at, id) без content
+    async def list(self, cursor: Optional[str] = None, limit: int = settings.NEWS_PAGE_SIZE):
+        after = decode_cursor(cursor) if cursor else None
+        page = after[2] + 1 if after else 0
+
+        if page < settings.NEWS_FEED_CACHED_PAGES:
+            # ключ — разобранная позиция, а не строка курсора: разные кодировки
+            # одной позиции (base64 с паддингом и без, порядок полей JSON) дают один ключ
+            position = f"{after[0].isoformat() if after[0] else ''}:{after[1]}:{after[2]}" if after else "first"
+            return await news_feed_cache.get_or_load(
+                self.redis, f"{limit}:{position}", lambda: self._load_page(after, page, limit)
+            )
+        return await self._load_page(after, page, limit)
+
+    async def _load_page(self, after, page: int, limit: int):
+        query = (
+            select(*_SUMMARY_COLUMNS)
+            .order_by(News.published_at.desc(), News.id.desc())
+            .limit(limit + 1)
+        )
+        if after:
+            query = query.where(tuple_(News.published_at, News.id) < (after[0], after[1]))
+
+        logger.info(f"[DB QUERY] Страница {page} ленты получена из БД")
+        result = await self.db.execute(query)
+        rows = result.mappings().all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last["published_at"], last["id"], page)
+
+        return {
+            "items": [_summary_to_cache(row) for row in rows],
+            "next_cursor": next_cursor
+        }
 
     async def create(self,  data):
         news = News(**data)
         self.db.add(news)
         await self.db.commit()
         await self.db.refresh(news)
+        await self._write_through(news)
         return news
 
-    async def update(self, id: int,  data):
-        news = await self.get(id)
-        if news:
-            for key, value in data.items():
-                setattr(news, key, value)
-            await self.db.commit()
-            await self.db.refresh(news)
+    async def exists(self, id: int) -> bool:
+        result = await self.db.execute(select(News.id).where(News.id == id))
+        return result.scalar() is not None
 
-        return news
+    # один UPDATE ... RETURNING вместо SELECT + UPDATE + refresh.
+    # owner_id переносит проверку авторства в WHERE: None — без проверки (админ).
+    # None в ответе — новости нет или она чужая, различает вызывающий
+    async def update(self, id: int,  data, owner_id: Optional[int] = None):
+        if not data:
+            query = select(News).where(News.id == id)
+        else:
+            query = update(News).where(News.id == id).values(**data).returning(News)
+        if owner_id is not None:
+            query = query.where(News.author_id == owner_id)
 
-    async def delete(self, id: int):
-        news = await self.get(id)
-        if news:
-            await self.db.delete(news)
+        result = await self.db.execute(query)
+        news = result.scalars().first()
+        if news and data:
             await self.db.commit()
+            await self._write_through(news)
         return news
+
+    async def delete(self, id: int, owner_id: Optional[int] = None):
+        query = delete(News).where(News.id == id).returning(News.id)
+        if owner_id is not None:
+            query = query.where(News.author_id == owner_id)
+
+        result = await self.db.execute(query)
+        deleted = result.scalar() is not None
+        if deleted:
+            await self.db.commit()
+            self.entities.discard(News, id)
+            await news_cache.delete(self.redis, id)
+            await news_response_cache.delete(self.redis, id)
+            # комментарии удалены каскадом в БД
+            await comment_page_cache.delete(self.redis, id)
+            await news_feed_cache.invalidate_all(self.redis)
+            logger.info(f"[CACHE DELETE] News {id} удалена из Redis")
+        return deleted
+
+    # сущность и готовое тело содержат comments_count; лента догонит по своему TTL
+    async def evict_cached(self, id: int):
+        self.entities.discard(News, id)
+        await news_cache.delete(self.redis, id)
+        await news_response_cache.delete(self.redis, id)
+
+    # пересчитывает comments_count для новостей с id в (after_id, after_id + batch],
+    # возвращает id исправленных новостей.
+    # Сначала строки пачки блокируются: транзакции с ±1 к счётчику либо
+    # успевают закоммититься (и их комментарии видны пересчёту), либо ждут
+    # и прибавляют к уже пересчитанному значению. Пересчёт — отдельным
+    # запросом: в READ COMMITTED у него свой снимок, взятый после блокировки.
+    async def reconcile_comments_count(self, after_id: int, batch: int) -> List[int]:
+        params = {"after_id": after_id, "batch": batch}
+        await self.db.execute(text("""
+            SELECT id FROM news
+            WHERE id > :after_id AND id <= :after_id + :batch
+            ORDER BY id
+            FOR UPDATE
+        """), params)
+        result = await self.db.execute(text("""
+            UPDATE news SET comments_count = actual.cnt
+            FROM (
+                SELECT n.id, (SELECT count(*) FROM comments c WHERE c.news_id = n.id) AS cnt
+                FROM news n
+                WHERE n.id > :after_id AND n.id <= :after_id + :batch
+            ) actual
+            WHERE news.id = actual.id AND news.comments_count <> actual.cnt
+            RETURNING news.id
+        """), params)
+        fixed = list(result.scalars().all())
+        await self.db.commit()
+        for id in fixed:
+            await self.evict_cached(id)
+        return fixed
+
+    async def max_id(self) -> int:
+        result = await self.db.execute(select(func.max(News.id)))
+        return result.scalar() or 0
+
+    # кэш обновляется в том же code path, что и БД, поэтому TTL может быть длинным
+    async def _write_through(self, news: News):
+        self.entities.discard(News, news.id)
+        await news_cache.set(self.redis, news.id, _news_to_cache(news))
+        await news_feed_cache.invalidate_all(self.redis)
+        logger.info(f"[CACHE SET] News {news.id} обновлена в Redis на {news_cache.ttl}s")
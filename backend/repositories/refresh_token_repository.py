@@ -1,46 +1,405 @@
-import json
 from redis.asyncio import Redis
-from datetime import timedelta
+from redis.commands.core import AsyncScript
+from redis.exceptions import ResponseError
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional
+import logging
+import time
 from config import settings
+from models.refresh_token import RefreshToken
+from models.user import User
+from utils.codec import cache_codec
+
+logger = logging.getLogger("uvicorn")
+
+# Сессии пользователя хранятся в двух ключах:
+#   sessions:{user_id}      hash  jti -> данные сессии
+#   sessions:exp:{user_id}  zset  jti -> время истечения (unix)
+# Оба ключа живут не дольше самой свежей сессии, истёкшие записи
+# вычищаются лениво при любом обращении, а число сессий ограничено
+# MAX_SESSIONS_PER_USER — память на пользователя не растёт.
+#
+# Redis — горячий уровень. Общие для всех ключи:
+#   sessions:active  zset    user_id -> время последней активности (мс)
+#   sessions:cold    bitmap  бит user_id = 1, если сессии выгружены в Postgres
+# Фоновая выгрузка (flush_idle) переносит сессии пользователей, неактивных
+# дольше SESSION_IDLE_SECONDS, в таблицу refresh_tokens, а первое обращение
+# к холодному пользователю загружает их обратно. Так Redis растёт с числом
+# активных пользователей, а не всех выданных токенов.
+#
+# Все скрипты сессий получают KEYS[1..4] в этом порядке и ARGV[1] = now,
+# ARGV[2] = user_id. Холодный пользователь — ошибка SESSIONS_COLD.
+
+_COLD = "SESSIONS_COLD"
+
+# удаляем не больше 1000 за раз, чтобы не держать Redis
+_PRUNE = """
+local function prune(now)
+    local expired = redis.call("zrangebyscore", KEYS[2], "-inf", now, "LIMIT", 0, 1000)
+    if #expired > 0 then
+        redis.call("hdel", KEYS[1], unpack(expired))
+        redis.call("zrem", KEYS[2], unpack(expired))
+    end
+end
+
+-- метка активности строго растёт, даже если два изменения пришлись
+-- на одну миллисекунду: по ней выгрузка понимает, что снимок устарел
+local function touch()
+    local now_ms = tonumber(ARGV[1]) * 1000
+    local last = tonumber(redis.call("zscore", KEYS[3], ARGV[2]) or 0)
+    if last >= now_ms then
+        now_ms = last + 1
+    end
+    redis.call("zadd", KEYS[3], now_ms, ARGV[2])
+end
+"""
+
+_ENSURE_HOT = """
+if redis.call("getbit", KEYS[4], ARGV[2]) == 1 then
+    return redis.error_reply("%s")
+end
+""" % _COLD
+
+# добавляет сессию и вытесняет самые старые сверх лимита
+_ADD_SESSION = _PRUNE + """
+local function add_session(token, data, expires_at, ttl, max_sessions)
+    redis.call("hset", KEYS[1], token, data)
+    redis.call("zadd", KEYS[2], expires_at, token)
+    local extra = redis.call("zcard", KEYS[2]) - max_sessions
+    if extra > 0 then
+        local oldest = redis.call("zrange", KEYS[2], 0, extra - 1)
+        redis.call("hdel", KEYS[1], unpack(oldest))
+        redis.call("zrem", KEYS[2], unpack(oldest))
+    end
+    redis.call("expire", KEYS[1], ttl)
+    redis.call("expire", KEYS[2], ttl)
+end
+"""
+
+# ARGV[3..]: jti, данные, expires_at, ttl, max_sessions
+_CREATE_SCRIPT = _ADD_SESSION + _ENSURE_HOT + """
+prune(ARGV[1])
+add_session(ARGV[3], ARGV[4], ARGV[5], ARGV[6], tonumber(ARGV[7]))
+touch()
+"""
+
+# Ротация refresh-токена за один round trip и атомарно: пока скрипт
+# выполняется, Redis не обслуживает другие команды, поэтому из двух
+# одновременных refresh с одним токеном пройдёт только первый.
+#
+# Отдельного списка отозванных нет: hash сессий авторитетен, и токен,
+# которого в нём нет, уже отозван, использован или истёк.
+# Токен в прежней раскладке (KEYS[5] user_id:refresh:{jti}, KEYS[6]
+# user_id:sessions:{user_id}) принимается один раз и переезжает в hash,
+# если его не отозвали прежним blacklist-ключом KEYS[7]: такие ключи
+# больше не пишутся и истекают сами.
+# ARGV[3..]: старый jti, новый jti, данные нового, expires_at, ttl, max_sessions
+_ROTATE_SCRIPT = _ADD_SESSION + _ENSURE_HOT + """
+local now = tonumber(ARGV[1])
+local data = false
+local expires_at = redis.call("zscore", KEYS[2], ARGV[3])
+if expires_at and tonumber(expires_at) > now then
+    data = redis.call("hget", KEYS[1], ARGV[3])
+elseif redis.call("exists", KEYS[7]) == 0 then
+    data = redis.call("get", KEYS[5])
+end
+prune(ARGV[1])
+if not data then
+    return false
+end
+redis.call("hdel", KEYS[1], ARGV[3])
+redis.call("zrem", KEYS[2], ARGV[3])
+redis.call("del", KEYS[5], KEYS[6])
+add_session(ARGV[4], ARGV[5], ARGV[6], ARGV[7], tonumber(ARGV[8]))
+touch()
+return data
+"""
+
+# KEYS[5] — ключ токена в прежней раскладке; ARGV[3] — jti
+_DELETE_SCRIPT = _PRUNE + _ENSURE_HOT + """
+redis.call("hdel", KEYS[1], ARGV[3])
+redis.call("zrem", KEYS[2], ARGV[3])
+redis.call("del", KEYS[5])
+touch()
+"""
+
+# возвращает HGETALL уже без истёкших сессий
+_LIST_SCRIPT = _PRUNE + _ENSURE_HOT + """
+prune(ARGV[1])
+touch()
+return redis.call("hgetall", KEYS[1])
+"""
+
+# Возврат сессий из Postgres. Если их уже загрузил другой воркер — ничего
+# не делаем. ARGV[3] — ttl ключей, дальше тройки jti, данные, expires_at
+_LOAD_SCRIPT = _PRUNE + """
+if redis.call("getbit", KEYS[4], ARGV[2]) == 0 then
+    return 0
+end
+for i = 4, #ARGV, 3 do
+    redis.call("hset", KEYS[1], ARGV[i], ARGV[i + 1])
+    redis.call("zadd", KEYS[2], ARGV[i + 2], ARGV[i])
+end
+if #ARGV >= 4 then
+    redis.call("expire", KEYS[1], ARGV[3])
+    redis.call("expire", KEYS[2], ARGV[3])
+end
+redis.call("setbit", KEYS[4], ARGV[2], 0)
+touch()
+return 1
+"""
+
+# Удаление из Redis после записи снимка в Postgres — только если с момента
+# снимка сессии не менялись (метка активности та же).
+# ARGV: user_id, метка активности снимка, 1 — в снимке есть сессии
+_EVICT_SCRIPT = """
+if tonumber(redis.call("zscore", KEYS[3], ARGV[1]) or -1) ~= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call("del", KEYS[1], KEYS[2])
+redis.call("zrem", KEYS[3], ARGV[1])
+if ARGV[3] == "1" then
+    redis.call("setbit", KEYS[4], ARGV[1], 1)
+end
+return 1
+"""
+
+_ACTIVE_KEY = "sessions:active"
+_COLD_KEY = "sessions:cold"
+
+
+def _sessions_key(user_id: int) -> str:
+    return f"sessions:{user_id}"
+
+
+def _expiry_key(user_id: int) -> str:
+    return f"sessions:exp:{user_id}"
+
+
+def _legacy_refresh_key(token: str) -> str:
+    return f"user_id:refresh:{token}"
+
+
+def _legacy_sessions_key(user_id: int) -> str:
+    return f"user_id:sessions:{user_id}"
+
+
+def _legacy_blacklist_key(user_id: int, token: str) -> str:
+    return f"token:blacklist:{user_id}:{token}"
+
+
+def _user_keys(user_id: int) -> List[str]:
+    return [_sessions_key(user_id), _expiry_key(user_id), _ACTIVE_KEY, _COLD_KEY]
+
+
+class _SessionScripts(NamedTuple):
+    client: Redis
+    create: AsyncScript
+    rotate: AsyncScript
+    delete: AsyncScript
+    list: AsyncScript
+    load: AsyncScript
+    evict: AsyncScript
+
+
+_scripts: Optional[_SessionScripts] = None
+
+
+# Репозиторий создаётся на каждый запрос, а скрипты регистрируются один раз
+# на клиент Redis (как в RateLimiter): register_script считает SHA1 тела,
+# дальше идёт EVALSHA, который сам догружает скрипт после SCRIPT FLUSH
+def _session_scripts(redis: Redis) -> _SessionScripts:
+    global _scripts
+    if _scripts is None or _scripts.client is not redis:
+        _scripts = _SessionScripts(
+            redis,
+            *(redis.register_script(script) for script in (
+                _CREATE_SCRIPT, _ROTATE_SCRIPT, _DELETE_SCRIPT, _LIST_SCRIPT, _LOAD_SCRIPT, _EVICT_SCRIPT,
+            )),
+        )
+    return _scripts
+
 
 class RefreshTokenRepository:
-    def __init__(self, redis: Redis):
+    def __init__(self, db: AsyncSession, redis: Redis):
+        self.db = db
         self.redis = redis
+        scripts = _session_scripts(redis)
+        self._create_script = scripts.create
+        self._rotate_script = scripts.rotate
+        self._delete_script = scripts.delete
+        self._list_script = scripts.list
+        self._load_script = scripts.load
+        self._evict_script = scripts.evict
 
-    async def create(self, user_id: int, token: str, meta: dict = None):
-        meta = meta or {}
-        key = f"user_id:refresh:{token}"
-        await self.redis.setex(key, timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS), json.dumps({
+    @staticmethod
+    def _ttl() -> int:
+        return int(timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS).total_seconds())
+
+    @staticmethod
+    def _dumps(user_id: int, token: str, meta: dict = None) -> bytes:
+        return cache_codec.dumps({
             "user_id": user_id,
             "token": token,
-            **meta
-        }))
+            **(meta or {})
+        })
 
-        # Добавляем токен в безвременный список активных
-        await self.redis.sadd(f"user_id:sessions:{user_id}", token)
+    async def _run(self, script, user_id: int, keys: list = (), args: list = ()):
+        # холодного пользователя сначала поднимаем из Postgres, затем повторяем
+        for attempt in range(2):
+            try:
+                return await script(
+                    keys=_user_keys(user_id) + list(keys),
+                    args=[int(time.time()), user_id] + list(args),
+                )
+            except ResponseError as e:
+                if _COLD not in str(e) or attempt:
+                    raise
+                await self._load(user_id)
 
-    async def get(self, token: str):
-        token_data = await self.redis.get(f"user_id:refresh:{token}")
+    async def _load(self, user_id: int):
+        result = await self.db.execute(
+            select(RefreshToken.token, RefreshToken.user_agent, RefreshToken.created_at, RefreshToken.expires_at)
+            .where(
+                RefreshToken.user_id == user_id,
+                RefreshToken.is_active.is_(True),
+                RefreshToken.expires_at > datetime.utcnow(),
+            )
+        )
+        rows = result.all()
+        now = int(time.time())
+        args = [now, user_id, 1]
+        for row in rows:
+            expires_at = int((row.expires_at - datetime(1970, 1, 1)).total_seconds())
+            args[2] = max(args[2], expires_at - now)
+            args += [
+                row.token,
+                self._dumps(user_id, row.token, {
+                    "user_agent": row.user_agent,
+                    "created_at": row.created_at.isoformat() if row.created_at else None,
+                }),
+                expires_at,
+            ]
+        loaded = await self._load_script(keys=_user_keys(user_id), args=args)
+        if loaded:
+            logger.info(f"[SESSIONS LOAD] {len(rows)} сессий пользователя {user_id} загружены из БД")
+
+    async def create(self, user_id: int, token: str, meta: dict = None):
+        now = int(time.time())
+        await self._run(self._create_script, user_id, args=[
+            token,
+            self._dumps(user_id, token, meta),
+            now + self._ttl(),
+            self._ttl(),
+            settings.MAX_SESSIONS_PER_USER,
+        ])
+
+    async def rotate(self, user_id: int, token: str, new_token: str, meta: dict = None) -> Optional[dict]:
+        """
+        Отзывает token и выдаёт new_token одним скриптом.
+        Возвращает данные старого токена или None, если он уже
+        использован, отозван или истёк — тогда новый токен не создаётся.
+        """
+        now = int(time.time())
+        token_data = await self._run(
+            self._rotate_script,
+            user_id,
+            keys=[
+                _legacy_refresh_key(token),
+                _legacy_sessions_key(user_id),
+                _legacy_blacklist_key(user_id, token),
+            ],
+            args=[
+                token,
+                new_token,
+                self._dumps(user_id, new_token, meta),
+                now + self._ttl(),
+                self._ttl(),
+                settings.MAX_SESSIONS_PER_USER,
+            ],
+        )
         if not token_data:
             return None
+        return cache_codec.loads(token_data)
 
-        user_id = json.loads(token_data)["user_id"]
-        blacklisted = await self.redis.exists(f"token:blacklist:{user_id}:{token}")
-        if blacklisted:
-            return None
-        return json.loads(token_data)
-
-    async def delete(self, user_id: int, token: str, blacklist: bool = False):
-        await self.redis.delete(f"user_id:refresh:{token}")
-        await self.redis.srem(f"user_id:sessions:{user_id}", token)
-        if blacklist:
-            await self.redis.setex(
-                f"token:blacklist:{user_id}:{token}",
-                timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
-                "revoked"
-            )
+    async def delete(self, user_id: int, token: str):
+        await self._run(self._delete_script, user_id, keys=[_legacy_refresh_key(token)], args=[token])
+
+    async def get_user_sessions(self, user_id: int) -> List[dict]:
+        # один вызов: чистка истёкших и все живые сессии пользователя
+        flat = await self._run(self._list_script, user_id)
+        return [cache_codec.loads(data) for data in flat[1::2]]
+
+    async def flush_idle(self, idle_before_ms: int, batch: int) -> int:
+        """
+        Переносит в refresh_tokens сессии до batch пользователей, неактивных
+        с idle_before_ms, и освобождает их ключи в Redis.
+        Возвращает число просмотренных пользователей (0 — выгружать нечего).
+        """
+        idle = await self.redis.zrangebyscore(_ACTIVE_KEY, "-inf", idle_before_ms, start=0, num=batch)
+        if not idle:
+            return 0
+        user_ids = [int(user_id) for user_id in idle]
+
+        # снимок вместе с меткой активности, на которую он сделан
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for user_id in user_ids:
+                pipe.zscore(_ACTIVE_KEY, user_id)
+                pipe.hgetall(_sessions_key(user_id))
+                pipe.zrange(_expiry_key(user_id), 0, -1, withscores=True)
+            snapshot = await pipe.execute()
+
+        # сессии удалённых пользователей не переносим: FK не пропустит
+        result = await self.db.execute(select(User.id).where(User.id.in_(user_ids)))
+        existing = set(result.scalars().all())
+
+        now = time.time()
+        rows, marks = [], []
+        for i, user_id in enumerate(user_ids):
+            mark, sessions, expiries = snapshot[3 * i: 3 * i + 3]
+            if mark is None:
+                continue
+            live = {token: expires_at for token, expires_at in expiries if expires_at > now}
+            has_sessions = user_id in existing and bool(live)
+            if has_sessions:
+                for token, expires_at in live.items():
+                    data = sessions.get(token)
+                    if data is None:
+                        continue
+                    data = cache_codec.loads(data)
+                    created_at = data.get("created_at")
+                    rows.append({
+                        "token": token.decode(),
+                        "user_id": user_id,
+                        "user_agent": (data.get("user_agent") or "")[:500] or None,
+                        "expires_at": datetime.utcfromtimestamp(expires_at),
+                        "is_active": True,
+                        "created_at": datetime.fromisoformat(created_at) if created_at else datetime.utcnow(),
+                    })
+            marks.append((user_id, mark, has_sessions))
+
+        # снимок заменяет прежнюю выгрузку пользователя целиком:
+        # отозванные с тех пор токены просто не попадают в таблицу
+        await self.db.execute(delete(RefreshToken).where(RefreshToken.user_id.in_(user_ids)))
+        if rows:
+            await self.db.execute(insert(RefreshToken), rows)
+        await self.db.commit()
 
-    async def get_user_sessions(self, user_id: int):
-        tokens = await self.redis.smembers(f"user_id:sessions:{user_id}")
-        return list(tokens)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id, mark, has_sessions in marks:
+                await self._evict_script(
+                    keys=_user_keys(user_id),
+                    args=[user_id, repr(mark), int(has_sessions)],
+                    client=pipe,
+                )
+            evicted = sum(await pipe.execute())
+        logger.info(f"[SESSIONS FLUSH] {len(rows)} сессий выгружено в БД, освобождено пользователей: {evicted}")
+        return len(user_ids)
 
+    async def delete_expired(self) -> int:
+        result = await self.db.execute(delete(RefreshToken).where(RefreshToken.expires_at <= datetime.utcnow()))
+        await self.db.commit()
+        return result.rowcount
@@ -1,71 +1,113 @@
 from datetime import datetime
+from typing import List, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from redis.asyncio import Redis
 from sqlalchemy.future import select
+from sqlalchemy import update, delete
 from models.user import User
 from repositories.base import Repository
+from cache import user_cache, user_response_cache
 from config import settings
-import json
+from utils.identity_map import RequestIdentityMap
 import logging
 
 logger = logging.getLogger("uvicorn")
 
 
+def _user_to_cache(user: User) -> dict:
+    return {
+        "id": user.id,
+        "registered_at": user.registered_at.isoformat() if user.registered_at else None,
+        "avatar_url": user.avatar_url,
+        "is_author_verified": user.is_author_verified,
+        "login": user.login,
+        "role": user.role
+    }
+
+def _user_from_cache(data: dict) -> User:
+    return User(
+        id=data["id"],
+        registered_at=datetime.fromisoformat(data["registered_at"]) if data["registered_at"] else None,
+        avatar_url=data["avatar_url"],
+        is_author_verified=data["is_author_verified"],
+        login=data["login"],
+        role=data["role"],
+        password_hash=""  # безопасно, чтобы не возвращать хеш
+    )
+
+
 class UserRepository(Repository):
     def __init__(self, db: AsyncSession, redis: Redis):
         self.db = db
         self.redis = redis
+        self.entities = RequestIdentityMap(db)
 
     # нужно там, где важна up-to-date инфа о пользователе
     # например, при проверке существования перед update
     async def get(self, id: int):
-        result = await self.db.execute(select(User).where(User.id == id))
-        user =  result.scalars().first()
+        user = self.entities.get_loaded(User, id)
+        if user is not None:
+            logger.info(f"[IDENTITY MAP] User {id} уже загружен в этом запросе")
+            return user
 
         logger.info(f"[DB QUERY, cache restricted] User {id} получен из БД")
-
-        return user
+        return await self.db.get(User, id)
 
     # нужно для вывода нечувствительной информации о пользователе (aka профиль)
-    # ещё для проверки ролей в зависимостях
+    # ещё для проверки ролей в зависимостях: get_current_user кладёт
+    # пользователя в карту запроса, и сервисы дальше берут его оттуда
     async def get_cached(self, id: int):
-        cache_key = f"user:{id}"
-        cached_data = await self.redis.get(cache_key)
-        if cached_data:
-            logger.info(f"[CACHE HIT] User {id} получен из Redis")
-            data = json.loads(cached_data)
-            user = User(
-                id=data["id"],
-                registered_at=datetime.fromisoformat(data["registered_at"]) if data["registered_at"] else None,
-                avatar_url=data["avatar_url"],
-                is_author_verified=data["is_author_verified"],
-                login=data["login"],
-                role=data["role"],
-                password_hash=""  # безопасно, чтобы не возвращать хеш
-            )
-
+        user = self.entities.get(User, id)
+        if user is not None:
             return user
+        data = await user_cache.get_or_load(self.redis, id, lambda: self._load_for_cache(id))
+        if not data:
+            return None
+        user = _user_from_cache(data)
+        self.entities.add_cached(User, id, user)
+        return user
 
+    async def _load_for_cache(self, id: int):
         result = await self.db.execute(select(User).where(User.id == id))
         user = result.scalars().first()
-        if not user:
-            return None
-
         logger.info(f"[DB QUERY] User {id} получен из БД")
-        data_to_cache = {
-           "id": user.id,
-           "registered_at": user.registered_at.isoformat() if user.registered_at else None,
-            "avatar_url": user.avatar_url,
-            "is_author_verified": user.is_author_verified,
-            "login": user.login,
-            "role": user.role
-        }
-
-        await self.redis.set(cache_key, json.dumps(data_to_cache), ex=settings.USER_CACHE_TTL)
-        logger.info(f"[CACHE SET] User {id} сохранён в Redis на {settings.USER_CACHE_TTL}s")
-        
-        return user
+        return _user_to_cache(user) if user else None
+
+    # готовое тело ответа GET /users/{id}, рендерит его сервис
+    async def get_cached_response(self, id: int) -> Optional[bytes]:
+        return await user_response_cache.get_raw(self.redis, id)
+
+    async def set_cached_response(self, id: int, body: bytes):
+        await user_response_cache.set_raw(self.redis, id, body)
+
+    # запись тела, собранного из кэша сущности на промахе: не состоится,
+    # если с момента cached_response_generation тело обновили или удалили
+    async def cached_response_generation(self, id: int) -> bytes:
+        return await user_response_cache.generation(self.redis, id)
+
+    async def add_cached_response(self, id: int, body: bytes, generation: bytes):
+        await user_response_cache.set_raw_if_generation(self.redis, id, body, generation)
+
+    # пакетная версия get_cached для ленты: имена авторов одним запросом
+    async def get_many_cached(self, ids: List[int]):
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+
+        found = await user_cache.get_many(self.redis, ids)
+        missing = [id for id in ids if id not in found]
+        logger.info(f"[CACHE HIT] {len(found)} из {len(ids)} пользователей получены из Redis")
+
+        if missing:
+            logger.info(f"[DB QUERY] Пользователи {missing} получены из БД")
+            result = await self.db.execute(select(User).where(User.id.in_(missing)))
+            loaded = {user.id: _user_to_cache(user) for user in result.scalars().all()}
+            # nx: не перетираем более свежую запись от write-through
+            await user_cache.set_many(self.redis, loaded, nx=True)
+            found.update(loaded)
+
+        return [_user_from_cache(found[id]) for id in ids if id in found]
 
     # используется для авторизации, поэтому важна актуальность, не из кэша
     async def get_by_login(self, login: str):
@@ -83,20 +125,45 @@ class UserRepository(Repository):
         self.db.add(user)
         await self.db.commit()
         await self.db.refresh(user)
+        await self._write_through(user)
         return user
 
-    async def update(self, id: int,  dict):
-        user = await self.get(id)
+    # один UPDATE ... RETURNING; права (сам или админ) проверяет сервис по id
+    async def update(self, id: int,  data: dict):
+        if not data:
+            return await self.get(id)
+
+        result = await self.db.execute(update(User).where(User.id == id).values(**data).returning(User))
+        user = result.scalars().first()
         if user:
-            for key, value in data.items():
-                setattr(user, key, value)
             await self.db.commit()
-            await self.db.refresh(user)
+            await self._write_through(user)
         return user
 
-    async def delete(self, id: int):
-        user = await self.get(id)
-        if user:
-            await self.db.delete(user)
+    # compare-and-set по старому хешу: параллельная смена пароля не перетирается;
+    # хеш в кэш не попадает, поэтому кэш не трогаем
+    async def update_password_hash(self, id: int, old_hash: str, new_hash: str) -> bool:
+        result = await self.db.execute(
+            update(User)
+            .where(User.id == id, User.password_hash == old_hash)
+            .values(password_hash=new_hash)
+        )
+        await self.db.commit()
+        return result.rowcount > 0
+
+    async def delete(self, id: int) -> bool:
+        result = await self.db.execute(delete(User).where(User.id == id).returning(User.id))
+        deleted = result.scalar() is not None
+        if deleted:
             await self.db.commit()
-        return user
+            self.entities.discard(User, id)
+            await user_cache.delete(self.redis, id)
+            await user_response_cache.delete(self.redis, id)
+            logger.info(f"[CACHE DELETE] User {id} удалён из Redis")
+        return deleted
+
+    # роль и is_author_verified проверяются по кэшу, поэтому обновляем его сразу
+    async def _write_through(self, user: User):
+        self.entities.discard(User, user.id)
+        await user_cache.set(self.redis, user.id, _user_to_cache(user))
+        logger.info(f"[CACHE SET] User {user.id} обновлён в Redis на {user_cache.ttl}s")
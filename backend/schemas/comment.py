@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 class CommentCreate(BaseModel):
@@ -18,3 +18,7 @@ class CommentResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class CommentPage(BaseModel):
+    items: List[CommentResponse]
+    next_cursor: Optional[str] = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 class NewsCreate(BaseModel):
@@ -19,6 +19,27 @@ class NewsResponse(BaseModel):
     published_at: Optional[datetime] = None
     author_id: int
     cover_url: Optional[str] = None
+    comments_count: int = 0
 
     class Config:
         from_attributes = True
+
+# элемент ленты: без content, он бывает большим
+class NewsSummary(BaseModel):
+    id: int
+    title: str
+    published_at: Optional[datetime] = None
+    author_id: int
+    cover_url: Optional[str] = None
+    comments_count: int = 0
+
+    class Config:
+        from_attributes = True
+
+class NewsPage(BaseModel):
+    items: List[NewsSummary]
+    next_cursor: Optional[str] = None
+
+class NewsSearchPage(BaseModel):
+    items: List[NewsSummary]
+    next_page: Optional[int] = None
@@ -6,12 +6,15 @@ from config import settings
 from repositories.user_repository import UserRepository
 from repositories.refresh_token_repository import RefreshTokenRepository
 from models.user import User
-from utils.password import verify_password, hash_password
+from utils.password import verify_and_rehash_password, hash_password
 from auth.auth import create_access_token, create_refresh_token
 
+import logging
 import re
 import secrets
 
+logger = logging.getLogger("uvicorn")
+
 LOGIN_REGEX = re.compile(r"^[a-zA-Z0-9._-]{3,32}$")
 PASSWORD_REGEX = re.compile(
     r"^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[!@#$%^&*(),.?\":{}|<>]).{8,}$"
@@ -45,7 +48,7 @@ class AuthService:
                 detail="Пароль должен быть ≥8 символов, включать заглавные и строчные буквы, цифру и спецсимвол"
             )
 
-        data["password_hash"] = hash_password(password)
+        data["password_hash"] = await hash_password(password)
         data.pop("password", None)
 
         data.setdefault("is_author_verified", False)
@@ -55,8 +58,14 @@ class AuthService:
 
     async def login(self, login: str, password: str, user_agent: str):
         user = await self.user_repo.get_by_login(login)
-        if not user or not verify_password(password, user.password_hash):
+        if not user:
             raise HTTPException(status_code=401, detail="Неверный логин или пароль")
+        valid, new_hash = await verify_and_rehash_password(password, user.password_hash)
+        if not valid:
+            raise HTTPException(status_code=401, detail="Неверный логин или пароль")
+        # параметры Argon2 сменились — хеш обновляется без сброса пароля
+        if new_hash and await self.user_repo.update_password_hash(user.id, user.password_hash, new_hash):
+            logger.info(f"[PASSWORD REHASH] Хеш пользователя {user.id} пересчитан с текущими параметрами Argon2")
 
         token_data = {
             "user_id": user.id,
@@ -79,35 +88,37 @@ class AuthService:
         try:
             payload = jwt.decode(refresh_token_jwt, settings.REFRESH_SECRET_KEY, algorithms=["HS256"])
             user_id = payload.get("user_id")
-            user_login = payload.get("login")
-            user_role = payload.get("role")
-            user_is_author_verified = payload.get("is_author_verified")
             jti = payload.get("jti")
             if not user_id or not jti:
                 raise HTTPException(status_code=401, detail="Invalid refresh token")
         except JWTError:
             raise HTTPException(status_code=401, detail="Invalid refresh token")
 
-        token_data = await self.refresh_token_repo.get(jti)
-        if not token_data:
+        # роль и верификацию берём актуальные, а не из refresh-токена:
+        # в режиме AUTH_STATELESS права проверяются только по claims
+        user = await self.user_repo.get_cached(user_id)
+        if not user:
             raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
 
-        await self.refresh_token_repo.delete(user_id=user_id, token=jti, blacklist=True)
-
         new_token_data = {
-            "user_id": user_id,
-            "login": user_login,
-            "role": user_role,
-            "is_author_verified": user_is_author_verified
+            "user_id": user.id,
+            "login": user.login,
+            "role": user.role,
+            "is_author_verified": user.is_author_verified
         }
         new_access_token = create_access_token(new_token_data)
         new_refresh_token_str, new_refresh_token_jwt = create_refresh_token(new_token_data)
 
-        await self.refresh_token_repo.create(
+        # проверка, отзыв старого и выдача нового — один атомарный вызов Redis,
+        # поэтому повторное использование токена невозможно даже при гонке
+        token_data = await self.refresh_token_repo.rotate(
             user_id=user_id,
-            token=new_refresh_token_str,
+            token=jti,
+            new_token=new_refresh_token_str,
             meta={"user_agent": user_agent, "created_at": datetime.utcnow().isoformat()}
         )
+        if not token_data:
+            raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
 
         return new_access_token, new_refresh_token_jwt
 
@@ -119,22 +130,20 @@ class AuthService:
             user_id = payload.get("user_id")
             jti = payload.get("jti")
             if user_id and jti:
-                await self.refresh_token_repo.delete(user_id=user_id, token=jti, blacklist=True)
+                await self.refresh_token_repo.delete(user_id=user_id, token=jti)
         except JWTError:
             pass
 
     async def get_user_sessions(self, user_id: int):
-        tokens = await self.refresh_token_repo.get_user_sessions(user_id)
-        sessions = []
-        for token in tokens:
-            token_data = await self.refresh_token_repo.get(token)
-            if token_data:
-                sessions.append({
-                    "token": token,
-                    "user_agent": token_data.get("user_agent"),
-                    "created_at": token_data.get("created_at")
-                })
-        return sessions
+        sessions = await self.refresh_token_repo.get_user_sessions(user_id)
+        return [
+            {
+                "token": session["token"],
+                "user_agent": session.get("user_agent"),
+                "created_at": session.get("created_at")
+            }
+            for session in sessions
+        ]
 
     async def oauth_login(self, user_info, user_agent: str):
         user = await self.user_repo.get_by_login(user_info.email)
@@ -142,7 +151,7 @@ class AuthService:
             random_password = secrets.token_urlsafe(32)
             user = await self.user_repo.create({
                 "login": user_info.email,
-                "password_hash": hash_password(random_password),
+                "password_hash": await hash_password(random_password),
                 "avatar_url": getattr(user_info, "picture", None),
                 "role": "user",
                 "is_author_verified": False
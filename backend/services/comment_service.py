@@ -1,11 +1,14 @@
 from repositories.comment_repository import CommentRepository
 from repositories.news_repository import NewsRepository
 from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
 
 from models.comment import Comment
 from models.user import User
 from models.news import News
 
+from auth.resolvers import owner_filter
+
 from typing import Optional
 
 class CommentService:
@@ -18,26 +21,44 @@ class CommentService:
         news_id = data["news_id"]
         data["author_id"] = author_id
 
-        news = await self.news_repo.get(news_id)
+        # существование проверяем по кэшу: удаление новости его чистит,
+        # а гонку с удалением поймает внешний ключ
+        news = await self.news_repo.get_cached(news_id)
 
         if not news:
             raise HTTPException(status_code=404, detail="News not found")
 
-        return await self.comment_repo.create(data)
+        try:
+            comment = await self.comment_repo.create(data)
+        except IntegrityError:
+            raise HTTPException(status_code=404, detail="News not found")
+        # comments_count в кэше новости устарел
+        await self.news_repo.evict_cached(news_id)
+        return comment
 
     async def get_comment(self, comment_id: int):
         return await self.comment_repo.get(comment_id)
 
-    async def list_comments(self, news_id: Optional[int] = None):
-        return await self.comment_repo.list(news_id=news_id)
+    async def list_comments(self, news_id: Optional[int], cursor: Optional[str], limit: int):
+        return await self.comment_repo.list(news_id=news_id, cursor=cursor, limit=limit)
 
-    async def update_comment(self, comment: Comment, data):
-        comment_id = comment.id
+    async def update_comment(self, current_user: User, comment_id: int, data):
         # author_id и news_id не должны меняться
         data.pop("author_id", None)
         data.pop("news_id", None)
-        return await self.comment_repo.update(comment_id, data)
+        comment = await self.comment_repo.update(comment_id, data, owner_id=owner_filter(current_user))
+        if not comment:
+            await self._raise_missing_or_forbidden(comment_id)
+        return comment
+
+    async def delete_comment(self, current_user: User, comment_id: int):
+        news_id = await self.comment_repo.delete(comment_id, owner_id=owner_filter(current_user))
+        if news_id is None:
+            await self._raise_missing_or_forbidden(comment_id)
+        # comments_count в кэше новости устарел
+        await self.news_repo.evict_cached(news_id)
 
-    async def delete_comment(self, comment: Comment):
-        comment_id = comment.id
-        return await self.comment_repo.delete(comment_id)
+    async def _raise_missing_or_forbidden(self, comment_id: int):
+        if await self.comment_repo.exists(comment_id):
+            raise HTTPException(status_code=403, detail="Permission denied")
+        raise HTTPException(status_code=404, detail="Comment not found")
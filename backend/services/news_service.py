@@ -3,6 +3,10 @@ from fastapi import HTTPException
 
 from models.news import News
 from models.user import User
+from schemas.news import NewsResponse
+from utils.http_cache import CachedResponse
+from auth.resolvers import owner_filter
+from typing import Optional, List
 
 class NewsService:
     def __init__(self, news_repo: NewsRepository):
@@ -12,6 +16,7 @@ class NewsService:
         # Принудительно перезаписываем author_id из current_user
         data["author_id"] = current_user.id
         news = await self.news_repo.create(data)
+        await self.news_repo.set_cached_response(news.id, self._render(news).pack())
 
         return news
 
@@ -20,18 +25,53 @@ class NewsService:
     async def get_news(self, news_id: int):
         return await self.news_repo.get_cached(news_id)
 
-    async def get_recent_news(self, days: int):
-        return await self.news_repo.get_recent(days)
+    # готовое JSON-тело ответа с ETag: на хите не трогаем ни ORM, ни Pydantic
+    async def get_news_response(self, news_id: int) -> Optional[CachedResponse]:
+        raw = await self.news_repo.get_cached_response(news_id)
+        if raw is not None:
+            return CachedResponse.unpack(raw)
 
-    async def list_news(self):
-        return await self.news_repo.list()
+        generation = await self.news_repo.cached_response_generation(news_id)
+        news = await self.news_repo.get_cached(news_id)
+        if not news:
+            return None
+        response = self._render(news)
+        # удаление или обновление между чтением сущности и записью тела
+        # меняет поколение, и устаревшее тело в кэш не ляжет
+        await self.news_repo.add_cached_response(news_id, response.pack(), generation)
+        return response
 
-    async def update_news(self, news: News,  data):
-        news_id = news.id
+    async def get_news_many(self, ids: List[int]):
+        return await self.news_repo.get_many_cached(ids)
+
+    async def get_recent_news(self, days: int, limit: int):
+        return await self.news_repo.get_recent(days, limit)
+
+    async def search_news(self, q: str, page: int, limit: int):
+        return await self.news_repo.search(q, page=page, limit=limit)
+
+    async def list_news(self, cursor: Optional[str], limit: int):
+        return await self.news_repo.list(cursor=cursor, limit=limit)
+
+    async def update_news(self, current_user: User, news_id: int,  data):
         # author_id не должен меняться
         data.pop("author_id", None)
-        return await self.news_repo.update(news_id, data)
+        updated_news = await self.news_repo.update(news_id, data, owner_id=owner_filter(current_user))
+        if not updated_news:
+            await self._raise_missing_or_forbidden(news_id)
+        await self.news_repo.set_cached_response(news_id, self._render(updated_news).pack())
+        return updated_news
+
+    async def delete_news(self, current_user: User, news_id: int):
+        if not await self.news_repo.delete(news_id, owner_id=owner_filter(current_user)):
+            await self._raise_missing_or_forbidden(news_id)
+
+    # запись не затронула строк: лишний SELECT только на пути ошибки
+    async def _raise_missing_or_forbidden(self, news_id: int):
+        if await self.news_repo.exists(news_id):
+            raise HTTPException(status_code=403, detail="Permission denied")
+        raise HTTPException(status_code=404, detail="News not found")
 
-    async def delete_news(self, news: News):
-        news_id = news.id
-        return await self.news_repo.delete(news_id)
+    # ETag считается здесь и хранится рядом с телом в кэше
+    def _render(self, news: News) -> CachedResponse:
+        return CachedResponse.from_body(NewsResponse.model_validate(news).model_dump_json().encode())
@@ -1,8 +1,13 @@
 from repositories.user_repository import UserRepository
+from auth.claims import revoke_access_tokens
 from fastapi import HTTPException
 from utils.password import hash_password
+from schemas.user import UserResponse
+from utils.http_cache import CachedResponse
+from models.user import User
 
 import re
+from typing import List, Optional
 
 LOGIN_REGEX = re.compile(r"^[a-zA-Z0-9._-]{3,32}$")
 PASSWORD_REGEX = re.compile(
@@ -36,7 +41,7 @@ class UserService:
                 detail="Пароль должен быть ≥8 символов, включать заглавные и строчные буквы, цифру и спецсимвол"
             )
 
-        data["password_hash"] = hash_password(password)
+        data["password_hash"] = await hash_password(password)
         data.pop("password", None)
 
         data["is_author_verified"] = False
@@ -47,14 +52,54 @@ class UserService:
     async def get_user(self, user_id: int):
         return await self.repo.get_cached(user_id)
 
+    # готовое JSON-тело профиля с ETag: на хите не трогаем ни ORM, ни Pydantic
+    async def get_user_response(self, user_id: int) -> Optional[CachedResponse]:
+        raw = await self.repo.get_cached_response(user_id)
+        if raw is not None:
+            return CachedResponse.unpack(raw)
+
+        generation = await self.repo.cached_response_generation(user_id)
+        user = await self.repo.get_cached(user_id)
+        if not user:
+            return None
+        response = self._render(user)
+        # удаление или обновление между чтением сущности и записью тела
+        # меняет поколение, и устаревшее тело в кэш не ляжет
+        await self.repo.add_cached_response(user_id, response.pack(), generation)
+        return response
+
+    async def get_users_many(self, ids: List[int]):
+        return await self.repo.get_many_cached(ids)
+
     async def list_users(self):
         return await self.repo.list()
 
-    async def update_user(self, user_id: int,  data):
+    async def update_user(self, current_user: User, user_id: int,  data):
+        self._check_can_modify(current_user, user_id)
         # Убедимся, что password не передаётся в update
         data.pop("password", None)
         data.pop("password_hash", None)
-        return await self.repo.update(user_id, data)
+        user = await self.repo.update(user_id, data)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        # права в выданных access-токенах устарели
+        if "role" in data or "is_author_verified" in data:
+            await revoke_access_tokens(self.repo.redis, user_id)
+        await self.repo.set_cached_response(user_id, self._render(user).pack())
+        return user
+
+    async def delete_user(self, current_user: User, user_id: int):
+        self._check_can_modify(current_user, user_id)
+        if not await self.repo.delete(user_id):
+            raise HTTPException(status_code=404, detail="User not found")
+        await revoke_access_tokens(self.repo.redis, user_id)
+
+    # изменить пользователя может только админ или сам пользователь;
+    # проверка по id из токена, без чтения строки
+    def _check_can_modify(self, current_user: User, user_id: int):
+        if user_id != current_user.id and current_user.role != "admin":
+            raise HTTPException(status_code=403, detail="Permission denied")
 
-    async def delete_user(self, user_id: int):
-        return await self.repo.delete(user_id)
+    # ETag считается здесь и хранится рядом с телом в кэше
+    def _render(self, user: User) -> CachedResponse:
+        return CachedResponse.from_body(UserResponse.model_validate(user).model_dump_json().encode())
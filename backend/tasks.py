@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import secrets
+import time
+from typing import Optional
+
+import redis.asyncio as redis
+
+from cache import WORKER_ID
+from config import settings
+from database import AsyncSessionLocal
+from repositories.news_repository import NewsRepository
+from repositories.refresh_token_repository import RefreshTokenRepository
+
+logger = logging.getLogger("uvicorn")
+
+_RECONCILE_LOCK_KEY = "lock:reconcile_comment_counts"
+
+
+async def reconcile_comment_counts(redis_client: redis.Redis) -> int:
+    """
+    Сверяет news.comments_count с фактическим числом комментариев
+    пачками по COMMENT_COUNT_RECONCILE_BATCH новостей, чтобы не держать
+    долгую транзакцию. Возвращает число исправленных новостей.
+    """
+    fixed = 0
+    async with AsyncSessionLocal() as session:
+        repo = NewsRepository(session, redis_client)
+        max_id = await repo.max_id()
+        after_id = 0
+        while after_id < max_id:
+            ids = await repo.reconcile_comments_count(after_id, settings.COMMENT_COUNT_RECONCILE_BATCH)
+            if ids:
+                logger.warning(f"[RECONCILE] comments_count исправлен у новостей {ids}")
+            fixed += len(ids)
+            after_id += settings.COMMENT_COUNT_RECONCILE_BATCH
+    return fixed
+
+
+async def reconcile_comment_counts_periodically(redis_client: redis.Redis):
+    # сверку запускает каждый воркер, но выполняет только взявший лок на период
+    while True:
+        await asyncio.sleep(settings.COMMENT_COUNT_RECONCILE_SECONDS)
+        try:
+            # лок не снимается: он живёт ровно период и не даёт соседям повторить сверку
+            acquired = await redis_client.set(
+                _RECONCILE_LOCK_KEY, WORKER_ID, nx=True, ex=settings.COMMENT_COUNT_RECONCILE_SECONDS
+            )
+            if acquired:
+                fixed = await reconcile_comment_counts(redis_client)
+                logger.info(f"[RECONCILE] Сверка comments_count завершена, исправлено {fixed}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[RECONCILE] Ошибка сверки comments_count: {e}")
+
+
+_SESSION_FLUSH_LOCK_KEY = "lock:flush_idle_sessions"
+
+# лок выгрузки принадлежит токену: продлить и снять его может только владелец
+_EXTEND_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+async def flush_idle_sessions(redis_client: redis.Redis, lock_token: Optional[str] = None) -> int:
+    """
+    Переносит сессии неактивных дольше SESSION_IDLE_SECONDS пользователей
+    из Redis в refresh_tokens пачками по SESSION_FLUSH_BATCH и удаляет
+    из таблицы истёкшие. Возвращает число просмотренных пользователей.
+    С lock_token лок выгрузки продлевается после каждой пачки; если он
+    потерян, выгрузка останавливается, чтобы не идти параллельно с другой.
+    """
+    idle_before_ms = int((time.time() - settings.SESSION_IDLE_SECONDS) * 1000)
+    lock_ms = settings.SESSION_FLUSH_INTERVAL_SECONDS * 1000
+    flushed = 0
+    async with AsyncSessionLocal() as session:
+        repo = RefreshTokenRepository(session, redis_client)
+        while True:
+            batch = await repo.flush_idle(idle_before_ms, settings.SESSION_FLUSH_BATCH)
+            flushed += batch
+            if batch < settings.SESSION_FLUSH_BATCH:
+                break
+            if lock_token is not None and not await redis_client.eval(
+                _EXTEND_LOCK_SCRIPT, 1, _SESSION_FLUSH_LOCK_KEY, lock_token, lock_ms
+            ):
+                logger.warning("[SESSIONS FLUSH] Лок выгрузки потерян, остановка")
+                return flushed
+        expired = await repo.delete_expired()
+        if expired:
+            logger.info(f"[SESSIONS FLUSH] Удалено истёкших сессий из БД: {expired}")
+    return flushed
+
+
+async def flush_idle_sessions_periodically(redis_client: redis.Redis):
+    # как и сверка счётчиков: запускает каждый воркер, выполняет взявший лок.
+    # Лок держится всю выгрузку (продлевается по пачкам) и снимается в конце
+    while True:
+        await asyncio.sleep(settings.SESSION_FLUSH_INTERVAL_SECONDS)
+        token = f"{WORKER_ID}:{secrets.token_hex(4)}"
+        try:
+            acquired = await redis_client.set(
+                _SESSION_FLUSH_LOCK_KEY, token, nx=True, px=settings.SESSION_FLUSH_INTERVAL_SECONDS * 1000
+            )
+            if not acquired:
+                continue
+            try:
+                flushed = await flush_idle_sessions(redis_client, token)
+                logger.info(f"[SESSIONS FLUSH] Выгрузка завершена, просмотрено пользователей: {flushed}")
+            finally:
+                await redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, _SESSION_FLUSH_LOCK_KEY, token)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[SESSIONS FLUSH] Ошибка выгрузки сессий: {e}")
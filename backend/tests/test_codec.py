@@ -0,0 +1,26 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.codec import CacheCodec
+
+
+def test_roundtrip():
+    codec = CacheCodec("json", "zlib", min_compress_bytes=16)
+    value = {"id": 1, "title": "Новость" * 10}
+    assert codec.loads(codec.dumps(value)) == value
+
+
+def test_untagged_legacy_json():
+    # так писались user_id:refresh:* до общего кодека
+    legacy = json.dumps({"user_id": 7, "expires_at": "2026-01-01T00:00:00"}).encode()
+    assert CacheCodec("json").loads(legacy) == {"user_id": 7, "expires_at": "2026-01-01T00:00:00"}
+
+
+def test_unknown_header():
+    with pytest.raises(ValueError):
+        CacheCodec("json").loads(b"\x00\x01garbage")
@@ -0,0 +1,138 @@
+"""
+Выгрузка сессий неактивных пользователей в Postgres и их возврат
+(RefreshTokenRepository.flush_idle / _load, скрипт _EVICT_SCRIPT).
+
+Идут в реальные Redis и Postgres из настроек backend (.env), поэтому
+запускаются в отдельном контейнере с кодом backend:
+    docker compose run --rm backend_unit_tests
+Порог неактивности — «сейчас», как при SESSION_IDLE_SECONDS=0:
+выгружаются все пользователи, включая созданного тестом.
+"""
+import secrets
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import redis.asyncio as redis
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+
+from config import settings
+from models.refresh_token import RefreshToken
+from models.user import User
+from repositories.refresh_token_repository import RefreshTokenRepository
+from repositories.user_repository import UserRepository
+
+# одним вызовом: повторный проход выгрузил бы пользователя уже после активности
+BATCH = 100_000
+
+
+@asynccontextmanager
+async def session_repo():
+    engine = create_async_engine(settings.DATABASE_URL)
+    redis_client = redis.from_url(settings.REDIS_URL)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            user = User(login=f"flush_{secrets.token_hex(6)}")
+            db.add(user)
+            await db.commit()
+            yield RefreshTokenRepository(db, redis_client), user.id
+    finally:
+        await redis_client.aclose()
+        await engine.dispose()
+
+
+# token в refresh_tokens уникален: у каждого пользователя теста свои
+def tokens(user_id: int):
+    return [f"{user_id}-{name}" for name in "abc"]
+
+
+async def flush(repo: RefreshTokenRepository):
+    await repo.flush_idle(int(time.time() * 1000), BATCH)
+
+
+async def is_cold(repo: RefreshTokenRepository, user_id: int) -> bool:
+    return await repo.redis.getbit("sessions:cold", user_id) == 1
+
+
+async def stored_tokens(repo: RefreshTokenRepository, user_id: int) -> set:
+    result = await repo.db.execute(select(RefreshToken.token).where(RefreshToken.user_id == user_id))
+    return set(result.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_flush_then_refresh_loads_and_rotates():
+    async with session_repo() as (repo, user_id):
+        a, b, c = tokens(user_id)
+        await repo.create(user_id, a, {"user_agent": "test"})
+        await flush(repo)
+
+        assert await is_cold(repo, user_id)
+        assert not await repo.redis.exists(f"sessions:{user_id}")
+        assert await stored_tokens(repo, user_id) == {a}
+
+        # первое обращение поднимает сессии из БД и ротирует как обычно
+        data = await repo.rotate(user_id, a, b)
+        assert data["token"] == a
+        assert data["user_agent"] == "test"
+        assert not await is_cold(repo, user_id)
+        assert [s["token"] for s in await repo.get_user_sessions(user_id)] == [b]
+        assert await repo.rotate(user_id, a, c) is None
+
+
+@pytest.mark.asyncio
+async def test_logout_while_cold():
+    async with session_repo() as (repo, user_id):
+        a, b, c = tokens(user_id)
+        await repo.create(user_id, a)
+        await flush(repo)
+        assert await is_cold(repo, user_id)
+
+        await repo.delete(user_id, a)
+        assert await repo.rotate(user_id, a, b) is None
+        assert await repo.get_user_sessions(user_id) == []
+
+        # следующая выгрузка заменяет снимок: отозванного токена в БД нет
+        await flush(repo)
+        assert await stored_tokens(repo, user_id) == set()
+
+
+@pytest.mark.asyncio
+async def test_activity_between_snapshot_and_evict_keeps_sessions():
+    async with session_repo() as (repo, user_id):
+        a, b, c = tokens(user_id)
+        await repo.create(user_id, a)
+
+        # вход пользователя, пока снимок пишется в БД
+        commit = repo.db.commit
+        async def commit_with_activity():
+            await repo.create(user_id, b)
+            await commit()
+        repo.db.commit = commit_with_activity
+        try:
+            await flush(repo)
+        finally:
+            repo.db.commit = commit
+
+        # метка активности сменилась — удаление из Redis отклонено
+        assert not await is_cold(repo, user_id)
+        assert {s["token"] for s in await repo.get_user_sessions(user_id)} == {a, b}
+        assert await repo.rotate(user_id, b, c) is not None
+
+
+@pytest.mark.asyncio
+async def test_delete_flushed_user():
+    async with session_repo() as (repo, user_id):
+        a, b, c = tokens(user_id)
+        await repo.create(user_id, a)
+        await flush(repo)
+        assert await stored_tokens(repo, user_id) == {a}
+
+        # выгруженные сессии удаляются каскадом вместе с пользователем
+        assert await UserRepository(repo.db, repo.redis).delete(user_id)
+        assert await stored_tokens(repo, user_id) == set()
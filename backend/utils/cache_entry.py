@@ -0,0 +1,20 @@
+import time
+from typing import Any, Tuple
+
+from config import settings
+from utils.codec import cache_codec
+
+# Запись кэша хранит момент "мягкого" устаревания. После него значение
+# ещё можно отдавать (stale-while-revalidate), пока один воркер его обновляет;
+# физически ключ живёт в Redis на CACHE_STALE_TTL дольше.
+# Общий формат для async- и sync-репозиториев.
+
+def encode_entry(payload: Any, ttl: int) -> bytes:
+    return cache_codec.dumps({"d": payload, "exp": time.time() + ttl})
+
+def decode_entry(raw: bytes) -> Tuple[Any, bool]:
+    entry = cache_codec.loads(raw)
+    return entry["d"], time.time() > entry["exp"]
+
+def redis_ttl(ttl: int) -> int:
+    return ttl + settings.CACHE_STALE_TTL
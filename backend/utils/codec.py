@@ -0,0 +1,121 @@
+"""
+Единый слой сериализации для всего, что лежит в Redis.
+
+Формат значения: 2 байта заголовка + тело.
+  1-й байт — кодек:  j (json), o (orjson), m (msgpack)
+  2-й байт — сжатие: - (нет), z (zlib), s (zstd)
+Декодер смотрит на заголовок, а не на настройки, поэтому смена
+CACHE_CODEC/CACHE_COMPRESSION не ломает уже записанные значения.
+Значения без заголовка (записанные до этого слоя простым json.dumps)
+читаются как JSON: ни один JSON-текст не начинается с байта кодека.
+orjson, msgpack и zstandard импортируются только при использовании.
+"""
+import json
+import zlib
+from typing import Any, Callable, Dict, Tuple
+
+from config import settings
+
+
+def _json_codec() -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    return (
+        lambda obj: json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode(),
+        json.loads,
+    )
+
+def _orjson_codec():
+    import orjson
+    return orjson.dumps, orjson.loads
+
+def _msgpack_codec():
+    import msgpack
+    return (
+        lambda obj: msgpack.packb(obj, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False),
+    )
+
+_CODECS = {
+    "json": (b"j", _json_codec),
+    "orjson": (b"o", _orjson_codec),
+    "msgpack": (b"m", _msgpack_codec),
+}
+
+
+def _zlib_compression():
+    return (lambda data: zlib.compress(data, 6), zlib.decompress)
+
+def _zstd_compression():
+    import zstandard
+    compressor = zstandard.ZstdCompressor(level=3)
+    decompressor = zstandard.ZstdDecompressor()
+    return compressor.compress, decompressor.decompress
+
+_COMPRESSIONS = {
+    "zlib": (b"z", _zlib_compression),
+    "zstd": (b"s", _zstd_compression),
+}
+_NO_COMPRESSION = b"-"
+
+_CODEC_FACTORIES = {tag: factory for tag, factory in _CODECS.values()}
+_COMPRESSION_FACTORIES = {tag: factory for tag, factory in _COMPRESSIONS.values()}
+
+
+class CacheCodec:
+    def __init__(self, codec: str, compression: str = "none", min_compress_bytes: int = 1024):
+        if codec not in _CODECS:
+            raise ValueError(f"Unknown cache codec: {codec}")
+        if compression != "none" and compression not in _COMPRESSIONS:
+            raise ValueError(f"Unknown cache compression: {compression}")
+        self.name = codec
+        self.compression = compression
+        self.min_compress_bytes = min_compress_bytes
+        self._codec_tag, factory = _CODECS[codec]
+        self._dumps, _ = factory()
+        self._compress = None
+        self._compress_tag = _NO_COMPRESSION
+        if compression != "none":
+            self._compress_tag, factory = _COMPRESSIONS[compression]
+            self._compress, _ = factory()
+        # декодеры создаются лениво по заголовку значения
+        self._loaders: Dict[bytes, Callable[[bytes], Any]] = {}
+        self._decompressors: Dict[bytes, Callable[[bytes], bytes]] = {}
+
+    def dumps(self, obj: Any) -> bytes:
+        body = self._dumps(obj)
+        # мелкие значения сжимать невыгодно: CPU дороже сэкономленных байт
+        if self._compress is not None and len(body) >= self.min_compress_bytes:
+            return self._codec_tag + self._compress_tag + self._compress(body)
+        return self._codec_tag + _NO_COMPRESSION + body
+
+    def loads(self, data: bytes) -> Any:
+        codec_tag, compress_tag, body = data[:1], data[1:2], data[2:]
+        if codec_tag not in _CODEC_FACTORIES or (
+            compress_tag != _NO_COMPRESSION and compress_tag not in _COMPRESSION_FACTORIES
+        ):
+            # старое значение без заголовка
+            try:
+                return json.loads(data)
+            except ValueError:
+                raise ValueError(f"Unknown cache value header: {data[:2]!r}") from None
+        if compress_tag != _NO_COMPRESSION:
+            body = self._decompressor(compress_tag)(body)
+        return self._loader(codec_tag)(body)
+
+    def _loader(self, tag: bytes):
+        loader = self._loaders.get(tag)
+        if loader is None:
+            loader = self._loaders[tag] = _CODEC_FACTORIES[tag]()[1]
+        return loader
+
+    def _decompressor(self, tag: bytes):
+        decompress = self._decompressors.get(tag)
+        if decompress is None:
+            decompress = self._decompressors[tag] = _COMPRESSION_FACTORIES[tag]()[1]
+        return decompress
+
+
+cache_codec = CacheCodec(
+    settings.CACHE_CODEC,
+    settings.CACHE_COMPRESSION,
+    settings.CACHE_COMPRESSION_MIN_BYTES,
+)
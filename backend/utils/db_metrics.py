@@ -0,0 +1,52 @@
+"""
+Сколько соединений из пула реально берут запросы каждого маршрута.
+
+AsyncSession берёт соединение только на первом запросе в БД, поэтому
+запросы, обслуженные из кэша, пул не трогают. Эти цифры показывают
+реальный DB-трафик по маршрутам: по ним и подбирается размер пула,
+а не по числу одновременных HTTP-запросов.
+"""
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+_checkouts: ContextVar[Optional[List[int]]] = ContextVar("db_checkouts", default=None)
+
+
+class RouteConnectionStats:
+    def __init__(self):
+        self._routes: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"requests": 0, "with_db": 0, "checkouts": 0}
+        )
+
+    def install(self, engine: AsyncEngine) -> None:
+        @event.listens_for(engine.sync_engine, "checkout")
+        def _count(dbapi_connection, connection_record, connection_proxy):
+            checkouts = _checkouts.get()
+            if checkouts is not None:
+                checkouts[0] += 1
+
+    # счётчик запроса; изменяемый список, чтобы его видели и дочерние задачи
+    def start(self) -> List[int]:
+        checkouts = [0]
+        _checkouts.set(checkouts)
+        return checkouts
+
+    def record(self, route: str, checkouts: int) -> None:
+        stats = self._routes[route]
+        stats["requests"] += 1
+        stats["checkouts"] += checkouts
+        if checkouts:
+            stats["with_db"] += 1
+
+    def metrics(self) -> dict:
+        return {
+            route: {**stats, "db_ratio": round(stats["with_db"] / stats["requests"], 4)}
+            for route, stats in sorted(self._routes.items())
+        }
+
+
+route_connection_stats = RouteConnectionStats()
@@ -0,0 +1,76 @@
+"""
+Пулы соединений с замером ожидания checkout.
+
+У SQLAlchemy нет события «начал ждать соединение», поэтому ожидание
+меряется вокруг Pool.connect(): туда входят ожидание свободного
+соединения, открытие нового (overflow) и pre-ping. TimeoutError
+(пул исчерпан дольше pool_timeout) считается отдельно.
+"""
+import bisect
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+# верхние границы корзин гистограммы, мс
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class CheckoutStats:
+    def __init__(self):
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+        self.buckets[bisect.bisect_left(WAIT_BUCKETS_MS, seconds * 1000)] += 1
+
+    def metrics(self) -> dict:
+        labels = [f"le_{le}ms" for le in WAIT_BUCKETS_MS] + ["inf"]
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else None,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "wait_histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+class _TimedCheckout:
+    # общая на класс: Pool.recreate() создаёт новый экземпляр того же класса
+    stats: CheckoutStats
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.observe(time.perf_counter() - start)
+        return connection
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    stats = CheckoutStats()
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    stats = CheckoutStats()
+
+
+def pool_metrics(pool: Pool) -> dict:
+    metrics = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+    if isinstance(pool, _TimedCheckout):
+        metrics.update(pool.stats.metrics())
+    return metrics
@@ -0,0 +1,60 @@
+import hashlib
+from typing import NamedTuple, Optional
+
+from fastapi import Request, Response
+from config import settings
+
+
+def make_etag(body: bytes, weak: bool = False) -> str:
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+class CachedResponse(NamedTuple):
+    """
+    Готовое тело ответа вместе с ETag.
+    Хранится в кэше одним значением: ETag\n\nbody, поэтому хеш считается
+    один раз при рендере, а не на каждом хите.
+    Last-Modified не отдаётся: у сущностей нет времени изменения, а время
+    рендера подтверждало бы If-Modified-Since для изменённой сущности.
+    Пустая строка на его месте сохраняет формат уже записанных значений.
+    """
+    etag: str
+    body: bytes
+
+    @classmethod
+    def from_body(cls, body: bytes) -> "CachedResponse":
+        return cls(make_etag(body), body)
+
+    def pack(self) -> bytes:
+        return f"{self.etag}\n\n".encode() + self.body
+
+    @classmethod
+    def unpack(cls, raw: bytes) -> "CachedResponse":
+        etag, _, body = raw.split(b"\n", 2)
+        return cls(etag.decode(), body)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # для If-None-Match сравнение слабое (RFC 9110): W/ не учитывается
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    # If-Modified-Since не поддерживается: Last-Modified не отдаётся
+    if_none_match = request.headers.get("if-none-match")
+    return if_none_match is not None and _etag_matches(if_none_match, etag)
+
+def conditional_response(
+    request: Request,
+    body: bytes,
+    etag: Optional[str] = None,
+    weak: bool = False,
+) -> Response:
+    etag = etag or make_etag(body, weak=weak)
+    headers = {"ETag": etag, "Cache-Control": settings.HTTP_CACHE_CONTROL}
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,35 @@
+from typing import Any, Optional, Type
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.util import identity_key
+
+
+class RequestIdentityMap:
+    """
+    Сущности, уже полученные в рамках запроса, по ключу (model, id).
+    get_db отдаёт одну сессию на запрос, поэтому все репозитории запроса
+    (и резолверы, и сервисы) видят одну и ту же карту.
+
+    Загруженные из БД объекты лежат в identity map самой сессии,
+    восстановленные из кэша — в session.info, отдельно от них:
+    для get (нужна актуальность) годятся только первые.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._cached = db.info.setdefault("cached_entities", {})
+
+    # объект, загруженный из БД в этой сессии; без запроса в БД
+    def get_loaded(self, model: Type, id: int) -> Optional[Any]:
+        return self.db.identity_map.get(identity_key(model, id))
+
+    # для чтения из кэша годится и загруженный из БД объект, он свежее
+    def get(self, model: Type, id: int) -> Optional[Any]:
+        entity = self.get_loaded(model, id)
+        return entity if entity is not None else self._cached.get((model, id))
+
+    def add_cached(self, model: Type, id: int, entity: Any) -> None:
+        self._cached[(model, id)] = entity
+
+    def discard(self, model: Type, id: int) -> None:
+        self._cached.pop((model, id), None)
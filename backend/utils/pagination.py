@@ -0,0 +1,24 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+# Курсор непрозрачен для клиента: base64 от последней позиции страницы.
+# Номер страницы нужен, чтобы кэшировать только первые страницы ленты.
+def encode_cursor(published_at: Optional[datetime], id: int, page: int) -> str:
+    payload = {
+        "ts": published_at.isoformat() if published_at else None,
+        "id": id,
+        "p": page,
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int, int]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        published_at = datetime.fromisoformat(payload["ts"]) if payload["ts"] else None
+        return published_at, int(payload["id"]), int(payload["p"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
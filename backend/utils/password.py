@@ -1,6 +1,17 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
 from argon2 import PasswordHasher
+from fastapi import HTTPException
 from config import settings
 
+logger = logging.getLogger("uvicorn")
+
 ph = PasswordHasher(
     time_cost=settings.ARGON2_TIME_COST,
     memory_cost=settings.ARGON2_MEMORY_COST,
@@ -9,12 +20,152 @@ ph = PasswordHasher(
     salt_len=16,
 )
 
-def hash_password(password: str) -> str:
+# синхронные версии выполняются внутри процессов пула,
+# поэтому должны оставаться функциями уровня модуля (pickle)
+def _hash_password_sync(password: str) -> str:
     return ph.hash(password)
 
-def verify_password(password: str, hash: str) -> bool:
+def _verify_password_sync(password: str, hash: str) -> bool:
     try:
         ph.verify(hash, password)
         return True
     except:
         return False
+
+# После успешной проверки хеш с устаревшими параметрами (ARGON2_* сменили)
+# пересчитывается тут же, в том же процессе пула: пароль в открытом виде
+# есть только сейчас. Возвращает (совпал ли пароль, новый хеш или None)
+def _verify_and_rehash_sync(password: str, hash: str) -> Tuple[bool, Optional[str]]:
+    if not _verify_password_sync(password, hash):
+        return False, None
+    if ph.check_needs_rehash(hash):
+        return True, ph.hash(password)
+    return True, None
+
+# время самой работы, без ожидания в очереди пула
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordHasherPool:
+    """
+    Argon2 занимает ядро и 64 MiB на вызов, поэтому хеширование
+    выносится из event loop в отдельный пул процессов.
+    Очередь ограничена: при переполнении отвечаем 503, а не копим задачи.
+    Кроме длины очереди смотрим на ожидаемое в ней время (по скользящему
+    среднему длительности): если оно больше max_wait, отказываем сразу,
+    а не держим клиента до таймаута.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, timeout: float, max_wait: float):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_wait = max_wait
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._shed = 0
+        self._timeouts = 0
+        self._avg_seconds: Optional[float] = None
+
+    def start(self):
+        if self._executor is None:
+            # spawn, а не fork: форк процесса с работающим event loop небезопасен
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"[PASSWORD POOL] Запущен пул хеширования на {self.max_workers} процессов")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "in_flight": self._in_flight,
+            "queue_depth": max(self._in_flight - self.max_workers, 0),
+            "queue_limit": self.max_queue,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "shed": self._shed,
+            "timeouts": self._timeouts,
+            "avg_ms": round(self._avg_seconds * 1000, 1) if self._avg_seconds is not None else None,
+        }
+
+    def _expected_wait(self) -> float:
+        if self._avg_seconds is None:
+            return 0.0
+        ahead = self._in_flight - self.max_workers + 1
+        return max(ahead, 0) / self.max_workers * self._avg_seconds
+
+    def _overloaded(self, retry_after: float = 1) -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail="Сервис перегружен, повторите попытку позже",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    async def _run(self, fn, *args):
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            logger.warning(f"[PASSWORD POOL] Очередь переполнена ({self._in_flight}), запрос отклонён")
+            raise self._overloaded()
+
+        expected_wait = self._expected_wait()
+        if expected_wait > self.max_wait:
+            self._shed += 1
+            logger.warning(f"[PASSWORD POOL] Ожидание в очереди ~{expected_wait:.1f}s, запрос отклонён")
+            raise self._overloaded(expected_wait)
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        try:
+            # уже запущенную в процессе задачу отменить нельзя,
+            # но ожидающая в очереди будет снята при таймауте
+            result, seconds = await asyncio.wait_for(
+                loop.run_in_executor(self._executor, _timed, fn, *args),
+                timeout=self.timeout,
+            )
+            self._completed += 1
+            self._avg_seconds = seconds if self._avg_seconds is None else 0.8 * self._avg_seconds + 0.2 * seconds
+            return result
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            logger.warning(f"[PASSWORD POOL] Таймаут хеширования ({self.timeout}s)")
+            raise self._overloaded()
+        finally:
+            self._in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash_password_sync, password)
+
+    async def verify(self, password: str, hash: str) -> bool:
+        return await self._run(_verify_password_sync, password, hash)
+
+    async def verify_and_rehash(self, password: str, hash: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(_verify_and_rehash_sync, password, hash)
+
+
+password_hasher = PasswordHasherPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_QUEUE_SIZE,
+    timeout=settings.PASSWORD_HASH_TIMEOUT,
+    max_wait=settings.PASSWORD_HASH_MAX_WAIT,
+)
+
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
+
+async def verify_password(password: str, hash: str) -> bool:
+    return await password_hasher.verify(password, hash)
+
+async def verify_and_rehash_password(password: str, hash: str) -> Tuple[bool, Optional[str]]:
+    return await password_hasher.verify_and_rehash(password, hash)
@@ -0,0 +1,14 @@
+from typing import List
+
+from fastapi import HTTPException
+from config import settings
+
+# ?ids=1,2,3 -> [1, 2, 3]
+def parse_id_list(raw: str) -> List[int]:
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids должен быть списком целых чисел через запятую")
+    if len(ids) > settings.MAX_BATCH_IDS:
+        raise HTTPException(status_code=422, detail=f"Не больше {settings.MAX_BATCH_IDS} id за запрос")
+    return ids
@@ -0,0 +1,121 @@
+import hashlib
+import logging
+import math
+import time
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import HTTPException, Request
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+
+from config import settings
+
+logger = logging.getLogger("uvicorn")
+
+# Token bucket на каждую корзину: hash {tokens, ts} в Redis.
+# Все корзины запроса (IP, логин) проверяются и списываются одним скриптом:
+# либо запрос проходит по всем, либо ни одна не тратится.
+# KEYS — корзины; ARGV: now (мс), cost, затем пары rate (токенов/мс), burst.
+# Возвращает 0 или сколько мс ждать до следующей попытки.
+_TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local wait = 0
+local tokens = {}
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[1 + 2 * i])
+    local burst = tonumber(ARGV[2 + 2 * i])
+    local bucket = redis.call("hmget", key, "tokens", "ts")
+    local available = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    available = math.min(burst, available + math.max(0, now - ts) * rate)
+    tokens[i] = available
+    if available < cost then
+        wait = math.max(wait, (cost - available) / rate)
+    end
+end
+if wait > 0 then
+    return math.ceil(wait)
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[1 + 2 * i])
+    local burst = tonumber(ARGV[2 + 2 * i])
+    redis.call("hset", key, "tokens", tokens[i] - cost, "ts", now)
+    -- полная корзина ничем не отличается от отсутствующей
+    redis.call("pexpire", key, math.ceil(burst / rate))
+end
+return 0
+"""
+
+
+class Budget(NamedTuple):
+    per_minute: int
+    burst: int
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+# логин приходит от клиента: в ключ идёт дайджест фиксированной длины
+def login_key(login: str) -> str:
+    return hashlib.blake2b(login.encode(), digest_size=16).hexdigest()
+
+
+class RateLimiter:
+    """
+    Ограничение частоты дорогих ручек (Argon2 на каждый вызов).
+    Один round trip в Redis на запрос. Если Redis недоступен, запрос
+    пропускается: лимитер не должен класть вход вместе с Redis.
+    """
+
+    def __init__(self):
+        self._allowed = 0
+        self._limited = 0
+        self._errors = 0
+        self._script: Optional[AsyncScript] = None
+
+    # скрипт регистрируется один раз на клиент Redis: дальше только EVALSHA
+    def _bucket_script(self, redis: Redis) -> AsyncScript:
+        if self._script is None or self._script.registered_client is not redis:
+            self._script = redis.register_script(_TOKEN_BUCKET_SCRIPT)
+        return self._script
+
+    async def check(self, redis: Redis, scope: str, buckets: Dict[str, Budget], cost: int = 1) -> None:
+        if not settings.RATE_LIMIT_ENABLED or not buckets:
+            return
+        keys, args = [], [int(time.time() * 1000), cost]
+        for identity, budget in buckets.items():
+            keys.append(f"ratelimit:{scope}:{identity}")
+            args += [budget.per_minute / 60000, budget.burst]
+        try:
+            wait_ms = await self._bucket_script(redis)(keys=keys, args=args)
+        except Exception as e:
+            self._errors += 1
+            logger.warning(f"[RATE LIMIT] Redis недоступен, {scope} пропущен без проверки: {e}")
+            return
+
+        if wait_ms:
+            self._limited += 1
+            logger.warning(f"[RATE LIMIT] {scope}: превышен лимит для {', '.join(buckets)}")
+            raise HTTPException(
+                status_code=429,
+                detail="Слишком много попыток, повторите позже",
+                headers={"Retry-After": str(math.ceil(wait_ms / 1000))},
+            )
+        self._allowed += 1
+
+    def metrics(self) -> dict:
+        return {
+            "enabled": settings.RATE_LIMIT_ENABLED,
+            "allowed": self._allowed,
+            "limited": self._limited,
+            "errors": self._errors,
+        }
+
+
+rate_limiter = RateLimiter()
+
+LOGIN_IP_BUDGET = Budget(settings.RATE_LIMIT_LOGIN_IP_PER_MINUTE, settings.RATE_LIMIT_LOGIN_IP_BURST)
+LOGIN_USER_BUDGET = Budget(settings.RATE_LIMIT_LOGIN_USER_PER_MINUTE, settings.RATE_LIMIT_LOGIN_USER_BURST)
+REGISTER_IP_BUDGET = Budget(settings.RATE_LIMIT_REGISTER_IP_PER_MINUTE, settings.RATE_LIMIT_REGISTER_IP_BURST)
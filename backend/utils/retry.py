@@ -0,0 +1,42 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from config import settings
+
+logger = logging.getLogger("uvicorn")
+
+T = TypeVar("T")
+
+
+def backoff_delay(attempt: int) -> float:
+    return min(settings.RETRY_BACKOFF_MAX, settings.RETRY_BACKOFF_BASE * 2 ** attempt)
+
+
+# подключение к Redis/Postgres при старте: сервисы в compose
+# поднимаются параллельно, поэтому первые попытки могут не пройти
+async def retry_async(fn: Callable[[], Awaitable[T]], what: str, retries: int = settings.MAX_RETRIES) -> T:
+    for attempt in range(retries + 1):
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt == retries:
+                logger.error(f"[STARTUP] {what}: не удалось подключиться за {retries + 1} попыток: {e}")
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"[STARTUP] {what}: попытка {attempt + 1} не удалась ({e}), повтор через {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+def retry_sync(fn: Callable[[], T], what: str, retries: int = settings.MAX_RETRIES) -> T:
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == retries:
+                logger.error(f"[STARTUP] {what}: не удалось подключиться за {retries + 1} попыток: {e}")
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"[STARTUP] {what}: попытка {attempt + 1} не удалась ({e}), повтор через {delay:.1f}s")
+            time.sleep(delay)
@@ -0,0 +1,30 @@
+"""
+Счётчик SQL-запросов на HTTP-запрос для тестов и отладки.
+
+Счётчик живёт в contextvar: SQLAlchemy выполняет async-драйвер в greenlet
+с контекстом вызывающей задачи, поэтому before_cursor_execute видит
+счётчик того запроса, который его породил.
+"""
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+STATEMENTS_HEADER = "X-DB-Statements"
+
+_statements: ContextVar[Optional[List[str]]] = ContextVar("sql_statements", default=None)
+
+
+def install(engine: AsyncEngine) -> None:
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements = _statements.get()
+        if statements is not None:
+            statements.append(statement)
+
+
+def start() -> List[str]:
+    statements: List[str] = []
+    _statements.set(statements)
+    return statements
@@ -60,10 +60,15 @@ const NewsCard: React.FC<{ news: News }> = ({ news }) => {
       <p style={{ marginBottom: '1rem', color: 'var(--text-secondary)', fontSize: '0.875rem' }}>
         Дата: {new Date(news.published_at).toLocaleString()}
       </p>
-      <div
-        dangerouslySetInnerHTML={{ __html: renderContent(news.content) }}
-        style={{ color: 'var(--text-primary)' }}
-      />
+      <p style={{ marginBottom: '1rem', color: 'var(--text-secondary)', fontSize: '0.875rem' }}>
+        Комментарии: {news.comments_count ?? 0}
+      </p>
+      {news.content && (
+        <div
+          dangerouslySetInnerHTML={{ __html: renderContent(news.content) }}
+          style={{ color: 'var(--text-primary)' }}
+        />
+      )}
     </div>
   );
 };
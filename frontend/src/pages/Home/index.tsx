@@ -24,13 +24,17 @@ const Home: React.FC = () => {
 
   const {
     filteredNews,
+    nextCursor,
+    nextPage,
     loading,
+    loadingMore,
     error,
     setSearchQuery,
     setAuthorFilter,
     setDateFrom,
     setDateTo,
-    fetchNews
+    fetchNews,
+    loadMore
   } = useNewsStore();
 
   useEffect(() => {
@@ -45,7 +49,7 @@ const Home: React.FC = () => {
         <div className={styles.formGroup}>
           <input
             type="text"
-            placeholder="Поиск по заголовкам..."
+            placeholder="Поиск по новостям..."
             onChange={(e) => setSearchQuery(e.target.value)}
             style={{ width: '100%', padding: '0.5rem', marginBottom: '0.5rem' }}
           />
@@ -95,6 +99,15 @@ const Home: React.FC = () => {
           <NewsCard key={n.id} news={n} />
         ))
       )}
+
+      {/* Лента приходит страницами: следующая — по курсору (или номеру страницы поиска) */}
+      {!loading && (nextCursor !== null || nextPage !== null) && (
+        <div style={{ textAlign: 'center', margin: '1rem' }}>
+          <button onClick={loadMore} disabled={loadingMore} className={styles.btnGradient}>
+            {loadingMore ? 'Загрузка...' : 'Показать ещё'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -12,6 +12,7 @@ const NewsDetail: React.FC = () => {
   const { id } = useParams<{ id: string }>();
   const [news, setNews] = useState<News | null>(null);
   const [comments, setComments] = useState<Comment[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
   const { user } = useAuthState();
   const { authorsMap, fetchAuthorName } = useNewsStore();
@@ -22,8 +23,9 @@ const NewsDetail: React.FC = () => {
       try {
         const res = await apiClient.get(`/news/${id}`);
         setNews(res.data);
-        const comRes = await apiClient.get(`/comments?news_id=${id}`);
-        setComments(comRes.data);
+        const comRes = await apiClient.get('/comments', { params: { news_id: id } });
+        setComments(comRes.data.items);
+        setNextCursor(comRes.data.next_cursor);
       } catch (err) {
         console.error('Ошибка при загрузке новости', err);
         navigate('/');
@@ -56,7 +58,22 @@ const NewsDetail: React.FC = () => {
 
   const handleAddComment = () => {
     if (id) {
-      apiClient.get(`/comments?news_id=${id}`).then(res => setComments(res.data));
+      apiClient.get('/comments', { params: { news_id: id } }).then(res => {
+        setComments(res.data.items);
+        setNextCursor(res.data.next_cursor);
+      });
+    }
+  };
+
+  // Комментарии приходят страницами, следующая — по курсору
+  const handleLoadMoreComments = async () => {
+    if (!id || !nextCursor) return;
+    try {
+      const res = await apiClient.get('/comments', { params: { news_id: id, cursor: nextCursor } });
+      setComments(prev => [...prev, ...res.data.items]);
+      setNextCursor(res.data.next_cursor);
+    } catch (err) {
+      console.error('Ошибка при загрузке комментариев', err);
     }
   };
 
@@ -130,6 +147,11 @@ const NewsDetail: React.FC = () => {
             />
           ))}
         </div>
+        {nextCursor && (
+          <button onClick={handleLoadMoreComments} className={styles.editButton}>
+            Показать ещё
+          </button>
+        )}
       </div>
     </div>
   );
@@ -2,35 +2,42 @@ import { create } from 'zustand';
 import type { News } from '../types';
 import apiClient from '../api/client';
 
+const PAGE_SIZE = 20;
+// поиск уходит на сервер после паузы в наборе, а не на каждую букву
+const SEARCH_DELAY_MS = 300;
+
 interface NewsState {
-  allNews: News[];
+  loadedNews: News[];
   filteredNews: News[];
   authorsMap: Record<number, string>;
+  searchQuery: string;
+  authorFilter: string;
+  dateFrom: string;
+  dateTo: string;
+  // следующая страница ленты (курсор) или поиска (номер); обе null — дальше ничего нет
+  nextCursor: string | null;
+  nextPage: number | null;
   loading: boolean;
+  loadingMore: boolean;
   error: string | null;
   setSearchQuery: (query: string) => void;
   setAuthorFilter: (author: string) => void;
   setDateFrom: (date: string) => void;
   setDateTo: (date: string) => void;
   fetchNews: () => Promise<void>;
+  loadMore: () => Promise<void>;
   fetchAuthorName: (id: number) => Promise<string>;
 }
 
-export const useNewsStore = create<NewsState>((set, get) => ({
-  allNews: [],
-  filteredNews: [],
-  authorsMap: {},
-  loading: false,
-  error: null,
-
-  setSearchQuery: (query) => {
-    const { allNews, authorsMap, authorFilter, dateFrom, dateTo } = get();
-    let result = [...allNews];
+let searchTimer: ReturnType<typeof setTimeout> | undefined;
+// ответ на устаревший запрос (запрос поменялся, пока он шёл) отбрасывается
+let requestSeq = 0;
 
-    if (query) {
-      const lowerQuery = query.toLowerCase();
-      result = result.filter(n => n.title.toLowerCase().includes(lowerQuery));
-    }
+export const useNewsStore = create<NewsState>((set, get) => {
+  // Автор и даты фильтруют уже загруженные страницы; текст ищет сервер
+  const applyFilters = () => {
+    const { loadedNews, authorsMap, authorFilter, dateFrom, dateTo } = get();
+    let result = loadedNews;
 
     if (authorFilter) {
       const lowerAuthor = authorFilter.toLowerCase();
@@ -50,130 +57,130 @@ export const useNewsStore = create<NewsState>((set, get) => ({
     }
 
     set({ filteredNews: result });
-  },
-
-  setAuthorFilter: (author) => {
-    const { allNews, authorsMap, searchQuery, dateFrom, dateTo } = get();
-    let result = [...allNews];
-
-    if (searchQuery) {
-      const lowerQuery = searchQuery.toLowerCase();
-      result = result.filter(n => n.title.toLowerCase().includes(lowerQuery));
-    }
-
-    if (author) {
-      const lowerAuthor = author.toLowerCase();
-      result = result.filter(n => {
-        const authorName = authorsMap[n.author_id];
-        return authorName && authorName.toLowerCase().includes(lowerAuthor);
-      });
-    }
-
-    if (dateFrom) {
-      const from = new Date(dateFrom).getTime();
-      result = result.filter(n => new Date(n.published_at).getTime() >= from);
-    }
-    if (dateTo) {
-      const to = new Date(dateTo).getTime();
-      result = result.filter(n => new Date(n.published_at).getTime() <= to);
-    }
-
-    set({ filteredNews: result });
-  },
-
-  setDateFrom: (date) => {
-    const { allNews, authorsMap, searchQuery, authorFilter, dateTo } = get();
-    let result = [...allNews];
-
-    if (searchQuery) {
-      const lowerQuery = searchQuery.toLowerCase();
-      result = result.filter(n => n.title.toLowerCase().includes(lowerQuery));
-    }
-
-    if (authorFilter) {
-      const lowerAuthor = authorFilter.toLowerCase();
-      result = result.filter(n => {
-        const authorName = authorsMap[n.author_id];
-        return authorName && authorName.toLowerCase().includes(lowerAuthor);
-      });
-    }
-
-    if (date) {
-      const from = new Date(date).getTime();
-      result = result.filter(n => new Date(n.published_at).getTime() >= from);
-    }
-    if (dateTo) {
-      const to = new Date(dateTo).getTime();
-      result = result.filter(n => new Date(n.published_at).getTime() <= to);
-    }
-
-    set({ filteredNews: result });
-  },
-
-  setDateTo: (date) => {
-    const { allNews, authorsMap, searchQuery, authorFilter, dateFrom } = get();
-    let result = [...allNews];
+  };
 
+  // Имена авторов новой страницы — одним пакетным запросом
+  const loadAuthors = async (news: News[]) => {
+    const { authorsMap } = get();
+    const uniqueAuthorIds = [...new Set(news.map(n => n.author_id))].filter(id => !authorsMap[id]);
+    if (!uniqueAuthorIds.length) return;
+    const usersRes = await apiClient.get('/users', { params: { ids: uniqueAuthorIds.join(',') } });
+    const loaded: Record<number, string> = {};
+    for (const user of usersRes.data) {
+      loaded[user.id] = user.login;
+    }
+    set(state => ({ authorsMap: { ...state.authorsMap, ...loaded } }));
+  };
+
+  // Страница ленты по курсору или страница результатов поиска
+  const fetchPage = async (cursor: string | null, page: number) => {
+    const { searchQuery } = get();
     if (searchQuery) {
-      const lowerQuery = searchQuery.toLowerCase();
-      result = result.filter(n => n.title.toLowerCase().includes(lowerQuery));
-    }
-
-    if (authorFilter) {
-      const lowerAuthor = authorFilter.toLowerCase();
-      result = result.filter(n => {
-        const authorName = authorsMap[n.author_id];
-        return authorName && authorName.toLowerCase().includes(lowerAuthor);
-      });
-    }
-
-    if (dateFrom) {
-      const from = new Date(dateFrom).getTime();
-      result = result.filter(n => new Date(n.published_at).getTime() >= from);
-    }
-    if (date) {
-      const to = new Date(date).getTime();
-      result = result.filter(n => new Date(n.published_at).getTime() <= to);
-    }
-
-    set({ filteredNews: result });
-  },
-
-  fetchNews: async () => {
-    set({ loading: true, error: null });
-    try {
-      const res = await apiClient.get('/news');
-      const news = res.data;
-      set({ allNews: news, filteredNews: news });
-      // Подгружаем имена авторов
-      const uniqueAuthorIds = [...new Set(news.map((n: News) => n.author_id))];
-      for (const id of uniqueAuthorIds) {
-        await get().fetchAuthorName(id);
+      const res = await apiClient.get('/news/search', { params: { q: searchQuery, page, limit: PAGE_SIZE } });
+      return { items: res.data.items as News[], nextCursor: null, nextPage: res.data.next_page as number | null };
+    }
+    const res = await apiClient.get('/news', { params: { limit: PAGE_SIZE, cursor: cursor ?? undefined } });
+    return { items: res.data.items as News[], nextCursor: res.data.next_cursor as string | null, nextPage: null };
+  };
+
+  return {
+    loadedNews: [],
+    filteredNews: [],
+    authorsMap: {},
+    searchQuery: '',
+    authorFilter: '',
+    dateFrom: '',
+    dateTo: '',
+    nextCursor: null,
+    nextPage: null,
+    loading: false,
+    loadingMore: false,
+    error: null,
+
+    setSearchQuery: (query) => {
+      set({ searchQuery: query.trim() });
+      clearTimeout(searchTimer);
+      searchTimer = setTimeout(() => get().fetchNews(), SEARCH_DELAY_MS);
+    },
+
+    setAuthorFilter: (author) => {
+      set({ authorFilter: author });
+      applyFilters();
+    },
+
+    setDateFrom: (date) => {
+      set({ dateFrom: date });
+      applyFilters();
+    },
+
+    setDateTo: (date) => {
+      set({ dateTo: date });
+      applyFilters();
+    },
+
+    // первая страница; следующие — loadMore
+    fetchNews: async () => {
+      const seq = ++requestSeq;
+      set({ loading: true, error: null });
+      try {
+        const { items, nextCursor, nextPage } = await fetchPage(null, 0);
+        if (seq !== requestSeq) return;
+        set({ loadedNews: items, nextCursor, nextPage });
+        applyFilters();
+        await loadAuthors(items);
+        applyFilters();
+      } catch (err: any) {
+        if (seq === requestSeq) {
+          set({ error: err.response?.data?.detail || 'Ошибка загрузки новостей' });
+        }
+      } finally {
+        if (seq === requestSeq) {
+          set({ loading: false });
+        }
+      }
+    },
+
+    loadMore: async () => {
+      const { nextCursor, nextPage, loadingMore } = get();
+      if (loadingMore || (nextCursor === null && nextPage === null)) return;
+      const seq = requestSeq;
+      set({ loadingMore: true });
+      try {
+        const page = await fetchPage(nextCursor, nextPage ?? 0);
+        if (seq !== requestSeq) return;
+        set(state => ({
+          loadedNews: [...state.loadedNews, ...page.items],
+          nextCursor: page.nextCursor,
+          nextPage: page.nextPage,
+        }));
+        applyFilters();
+        await loadAuthors(page.items);
+        applyFilters();
+      } catch (err: any) {
+        set({ error: err.response?.data?.detail || 'Ошибка загрузки новостей' });
+      } finally {
+        set({ loadingMore: false });
+      }
+    },
+
+    fetchAuthorName: async (id) => {
+      const { authorsMap } = get();
+      if (authorsMap[id]) return authorsMap[id];
+
+      try {
+        const res = await apiClient.get(`/users/${id}`);
+        const login = res.data.login;
+        set(state => ({
+          authorsMap: { ...state.authorsMap, [id]: login }
+        }));
+        return login;
+      } catch {
+        const login = `ID: ${id}`;
+        set(state => ({
+          authorsMap: { ...state.authorsMap, [id]: login }
+        }));
+        return login;
       }
-    } catch (err: any) {
-      set({ error: err.response?.data?.detail || 'Ошибка загрузки новостей' });
-    } finally {
-      set({ loading: false });
-    }
-  },
-
-  fetchAuthorName: async (id) => {
-    const { authorsMap } = get();
-    if (authorsMap[id]) return authorsMap[id];
-
-    try {
-      const res = await apiClient.get(`/users/${id}`);
-      const login = res.data.login;
-      set(state => ({
-        authorsMap: { ...state.authorsMap, [id]: login }
-      }));
-      return login;
-    } catch {
-      const login = `ID: ${id}`;
-      set(state => ({
-        authorsMap: { ...state.authorsMap, [id]: login }
-      }));
-      return login;
     }
-  }
-}));
+  };
+});
@@ -9,10 +9,11 @@ export interface User {
 export interface News {
   id: number;
   title: string;
-  content: any; // JSON
+  content?: any; // JSON, в ленте не приходит
   published_at: string;
   author_id: number;
   cover_url?: string
+  comments_count?: number;
 }
 
 export interface Comment {
@@ -0,0 +1,54 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+import httpx
+import os
+
+BASE_URL = os.getenv("BASE_URL", "http://backend:8000")
+
+# Лимитер остаётся включённым: docker-compose поднимает ёмкость корзины на
+# логин (RATE_LIMIT_LOGIN_USER_BURST) до CONCURRENT_LOGINS, а свой логин на
+# каждый прогон не даёт повторному запуску упереться в опустевшую корзину
+LOGIN = f"hashload_{uuid.uuid4().hex[:8]}"
+PASSWORD = "L0ad_t3st_p@ssw0rd"
+CONCURRENT_LOGINS = 50
+
+
+def p99(samples):
+    samples = sorted(samples)
+    return samples[int(len(samples) * 0.99) - 1]
+
+
+async def measure_news_latency(client, count=100):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await client.get("/api/v1/news/1")
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+@pytest.mark.asyncio
+async def test_news_latency_flat_during_login_burst():
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=60) as client:
+        response = await client.post("/api/v1/auth/register", json={"login": LOGIN, "password": PASSWORD})
+        assert response.status_code == 200
+
+        baseline = p99(await measure_news_latency(client))
+
+        logins = [
+            client.post("/api/v1/auth/login", json={"login": LOGIN, "password": PASSWORD})
+            for _ in range(CONCURRENT_LOGINS)
+        ]
+        login_task = asyncio.gather(*logins)
+        # даём логинам попасть в пул, прежде чем мерить
+        await asyncio.sleep(0.05)
+        under_load = p99(await measure_news_latency(client))
+        login_responses = await login_task
+
+    assert all(r.status_code in (200, 503) for r in login_responses)
+    assert any(r.status_code == 200 for r in login_responses)
+    # синхронный Argon2 в event loop давал бы секунды на p99
+    assert under_load < baseline * 3 + 0.05
@@ -0,0 +1,38 @@
+import pytest
+import httpx
+import os
+
+BASE_URL = os.getenv("BASE_URL", "http://backend:8000")
+# должен совпадать с настройкой backend
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+
+pytestmark = pytest.mark.skipif(not RATE_LIMIT_ENABLED, reason="лимитер выключен (RATE_LIMIT_ENABLED=false)")
+
+# пользователя нет: проверяется только лимит на логин, Argon2 не нужен
+LOGIN = "ratelimit_probe"
+# больше ёмкости корзины на логин; значение то же, что у backend
+ATTEMPTS = int(os.getenv("RATE_LIMIT_LOGIN_USER_BURST", "5")) + 3
+
+
+@pytest.mark.asyncio
+async def test_login_attempts_are_rate_limited_per_login():
+    async with httpx.AsyncClient(base_url=BASE_URL) as client:
+        responses = [
+            await client.post("/api/v1/auth/login", json={"login": LOGIN, "password": "wrong"})
+            for _ in range(ATTEMPTS)
+        ]
+
+    statuses = [r.status_code for r in responses]
+    assert set(statuses) <= {401, 429}
+    limited = [r for r in responses if r.status_code == 429]
+    assert limited
+    assert int(limited[0].headers["Retry-After"]) >= 1
+    # после первого отказа корзина пуста до пополнения
+    assert statuses[statuses.index(429):] == [429] * len(limited)
+
+
+@pytest.mark.asyncio
+async def test_other_logins_are_not_affected():
+    async with httpx.AsyncClient(base_url=BASE_URL) as client:
+        response = await client.post("/api/v1/auth/login", json={"login": LOGIN + "_other", "password": "wrong"})
+        assert response.status_code == 401
@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+import httpx
+import os
+
+BASE_URL = os.getenv("BASE_URL", "http://backend:8000")
+
+LOGIN = "rotation"
+PASSWORD = "R0tat10n_p@ssw0rd"
+CONCURRENCY = 20
+
+
+async def login(client) -> str:
+    # 409 — пользователь остался с прошлого прогона, это нормально
+    response = await client.post("/api/v1/auth/register", json={"login": LOGIN, "password": PASSWORD})
+    assert response.status_code in (200, 409)
+    response = await client.post("/api/v1/auth/login", json={"login": LOGIN, "password": PASSWORD})
+    assert response.status_code == 200
+    return response.cookies["refresh_token"]
+
+
+async def refresh(client, refresh_token: str):
+    # cookie передаём явно, чтобы клиент не подставил уже ротированный токен
+    client.cookies.clear()
+    return await client.post("/api/v1/auth/refresh", cookies={"refresh_token": refresh_token})
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_cannot_be_reused():
+    async with httpx.AsyncClient(base_url=BASE_URL) as client:
+        refresh_token = await login(client)
+
+        response = await refresh(client, refresh_token)
+        assert response.status_code == 200
+        new_token = response.cookies["refresh_token"]
+
+        response = await refresh(client, refresh_token)
+        assert response.status_code == 401
+
+        response = await refresh(client, new_token)
+        assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_revoked_token_is_rejected():
+    # blacklist-ключей нет: отозванный токен отклоняется потому, что его нет в hash сессий
+    async with httpx.AsyncClient(base_url=BASE_URL) as client:
+        refresh_token = await login(client)
+        response = await refresh(client, refresh_token)
+        assert response.status_code == 200
+        rotated = response.cookies["refresh_token"]
+
+        client.cookies.clear()
+        response = await client.post("/api/v1/auth/logout", cookies={"refresh_token": rotated})
+        assert response.status_code == 200
+
+        for token in (rotated, refresh_token):
+            response = await refresh(client, token)
+            assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_concurrent_refresh_succeeds_once():
+    async with httpx.AsyncClient(base_url=BASE_URL) as client:
+        refresh_token = await login(client)
+
+    # отдельный клиент на запрос, чтобы cookie не смешивались
+    async def attempt():
+        async with httpx.AsyncClient(base_url=BASE_URL) as c:
+            return await refresh(c, refresh_token)
+
+    responses = await asyncio.gather(*[attempt() for _ in range(CONCURRENCY)])
+    statuses = sorted(r.status_code for r in responses)
+    assert statuses == [200] + [401] * (CONCURRENCY - 1)
+
+    # выданный победителю токен рабочий, и он единственный новый
+    winner = next(r for r in responses if r.status_code == 200)
+    async with httpx.AsyncClient(base_url=BASE_URL) as client:
+        response = await refresh(client, winner.cookies["refresh_token"])
+        assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_refresh_replaces_session():
+    async with httpx.AsyncClient(base_url=BASE_URL) as client:
+        refresh_token = await login(client)
+        response = await refresh(client, refresh_token)
+        assert response.status_code == 200
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        before = (await client.get("/api/v1/auth/sessions", headers=headers)).json()
+        response = await refresh(client, response.cookies["refresh_token"])
+        assert response.status_code == 200
+        after = (await client.get("/api/v1/auth/sessions", headers=headers)).json()
+
+        # старая сессия заменена новой, а не добавлена рядом
+        assert len(after) == len(before)
+        assert {s["token"] for s in after} != {s["token"] for s in before}
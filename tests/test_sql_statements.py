@@ -0,0 +1,70 @@
+import pytest
+import httpx
+import os
+
+BASE_URL = os.getenv("BASE_URL", "http://backend:8000")
+# backend отдаёт заголовок только с DEBUG=true
+STATEMENTS_HEADER = "X-DB-Statements"
+
+LOGIN = "sqlcount"
+PASSWORD = "Sql_c0unt_p@ssw0rd"
+NEWS_ID = 1
+
+
+def statements(response) -> int:
+    if STATEMENTS_HEADER not in response.headers:
+        pytest.skip("backend запущен без DEBUG, счётчик SQL недоступен")
+    return int(response.headers[STATEMENTS_HEADER])
+
+
+async def login(client) -> dict:
+    # 409 — пользователь остался с прошлого прогона, это нормально
+    response = await client.post("/api/v1/auth/register", json={"login": LOGIN, "password": PASSWORD})
+    assert response.status_code in (200, 409)
+    response = await client.post("/api/v1/auth/login", json={"login": LOGIN, "password": PASSWORD})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_cached_news_does_not_touch_db():
+    async with httpx.AsyncClient(base_url=BASE_URL) as client:
+        await client.get(f"/api/v1/news/{NEWS_ID}")  # прогрев кэша
+        response = await client.get(f"/api/v1/news/{NEWS_ID}")
+        assert response.status_code == 200
+        assert statements(response) == 0
+
+
+@pytest.mark.asyncio
+async def test_comment_write_statement_budget():
+    async with httpx.AsyncClient(base_url=BASE_URL) as client:
+        headers = await login(client)
+        # прогрев: пользователь и новость попадают в кэш
+        await client.get(f"/api/v1/news/{NEWS_ID}")
+        await client.get("/api/v1/auth/sessions", headers=headers)
+
+        # INSERT + UPDATE счётчика + refresh; новость и автор — из кэша
+        response = await client.post("/api/v1/comments", json={"text": "count me", "news_id": NEWS_ID}, headers=headers)
+        assert response.status_code == 200
+        assert statements(response) <= 3
+        comment_id = response.json()["id"]
+
+        # один UPDATE ... RETURNING с проверкой авторства в WHERE
+        response = await client.put(f"/api/v1/comments/{comment_id}", json={"text": "edited"}, headers=headers)
+        assert response.status_code == 200
+        assert statements(response) == 1
+
+        # DELETE и уменьшение счётчика одним statement
+        response = await client.delete(f"/api/v1/comments/{comment_id}", headers=headers)
+        assert response.status_code == 200
+        assert statements(response) == 1
+
+
+@pytest.mark.asyncio
+async def test_foreign_comment_write_is_rejected_cheaply():
+    async with httpx.AsyncClient(base_url=BASE_URL) as client:
+        headers = await login(client)
+        # несуществующий комментарий: UPDATE без строк + SELECT для выбора 404/403
+        response = await client.put("/api/v1/comments/999999999", json={"text": "x"}, headers=headers)
+        assert response.status_code == 404
+        assert statements(response) <= 2